@@ -1,15 +1,24 @@
-import pandas as pd
 import argparse
 from datetime import datetime
+import random
 import re
 import os
 import sys
-import warnings
+import time
+from movie_catalog import get_database_path, get_source_signature, load_light_catalog
+from movie_pool import get_journal_path, get_journal_signature, load_pool_state, read_journal_since, record_pool_changes, replay_pool_journal
 
-warnings.simplefilter(action='ignore', category=pd.errors.SettingWithCopyWarning)
+# pandas and the filter engine are imported by the get command only, so help,
+# list, remove, restore, reset and commands forwarded to `movie serve` start
+# without paying for them
 
 def get_csv_path():
-    """Get the path to movies.csv, handling both script and frozen exe contexts"""
+    """
+    Get the path to movies.csv, handling both script and frozen exe contexts.
+    The MOVIE_CSV environment variable points the tool at another catalog (e.g. for benchmarks).
+    """
+    if os.environ.get('MOVIE_CSV'):
+        return os.path.abspath(os.environ['MOVIE_CSV'])
     if getattr(sys, 'frozen', False):
         return os.path.join(os.path.dirname(sys.executable), 'movies.csv')
     else:
@@ -17,413 +26,764 @@ def get_csv_path():
 
 
 csv_path = get_csv_path()
+# Once `movie db import` has created it, the SQLite catalog is used instead of movies.csv
+database_path = get_database_path(csv_path)
 
 parser = argparse.ArgumentParser(description='Movie management tool.')
 subparsers = parser.add_subparsers(dest="command", help='Available commands')
 
-get_parser = subparsers.add_parser("get", help='Retrieve a random movie based on filters.')
-get_parser.add_argument('-r', '--rank', type=str, help='Provide rank requirements for your selection (e.g. 1000-, 50-100, 42).')
-get_parser.add_argument('-t100', '--top100', action='store_true', help='Limit selection to movies in the top 100 of its decade.')
-get_parser.add_argument('-d', '--director', type=str, help='Provide a director or a list of directors whose movies you want to select from (e.g. "Steven Spielberg", "Hitchcock").')
-get_parser.add_argument('-rt', '--runtime', type=str, help='Provide movie runtime requirements for your selection (e.g. 90-120, 90+, 60-).')
-get_parser.add_argument('-g', '--genre', type=str, help='Provide a genre or a list of genres to select a movie from (e.g. "Drama" or "Horror, Musical").')
-get_parser.add_argument('-y', '--year', type=str, help='Provide a decade, a year range, a year, or a combination of these to select a movie from (e.g. "2010s", "2010-2018", "1994", "2010-2014, 2015").')
-get_parser.add_argument('-cou', '--country', type=str, help='Provide a country or a list of countries that you want to limit your selected movies to (e.g. "United States", "France").')
-get_parser.add_argument('-l', '--language', type=str, help='Provide a language or a list of languages that you want to limit your selected movies to (e.g. "English", "Spanish").')
-get_parser.add_argument('-col', '--color', type=int, help='Limit selection to movies that are either black and white or in color. For black and white put 0, for color put 1.')
-get_parser.add_argument('-s', '--silent', type=int, help='Limit selection to movies that are silent or non-silent. For silent put 1, for non-silent put 0.')
-get_parser.add_argument('-rat', '--rating', type=str, help='Provide movie rating requirements for your selection (e.g. 7.0-7.4, 9+, 5.4-).')
-get_parser.add_argument('-v', '--votes', type=str, help='Provide movie vote count requirements for your selection (e.g. 10000+, 250000-500000, 100-).')
-get_parser.add_argument('-a', '--actor', type=str, help='Provide an actor or a list of actors that you want to limit your selected movies to (e.g. "James Stewart", "Zendaya, Tom Cruise").')
-get_parser.add_argument('-w', '--writer', type=str, help='Provide a writer or a list of writers that you want to limit your selected movies to (e.g. "Stan Lee", "Dan Aykroyd, Ernest Lehman").')
-get_parser.add_argument('-p', '--producer', type=str, help='Provide an actor or a list of actors that you want to limit your selected movies to (e.g. "Kevin Feige", "Ivan Reitman, Robert Wise").')
-get_parser.add_argument('-cin', '--cinematographer', type=str, help='Provide a cinematographer or a list of cinematographers that you want to limit your selected movies to (e.g. "Matthew Libatique", "Laszlo Kovacs, Ted McCord").')
-get_parser.add_argument('-e', '--editor', type=str, help='Provide an editor or a list of editors that you want to limit your selected movies to (e.g. "William Reynolds", "Dan Lebental, Sheldon Kahn").')
-get_parser.add_argument('-com', '--composer', type=str, help='Provide a composer or a list of composers that you want to limit your selected movies to (e.g. "Hans Zimmer", "Danny Elfman, John Williams").')
-get_parser.add_argument('-pc', '--production_company', type=str, help='Provide a production company or a list of production companies that you want to limit your selected movies to (e.g. "Marvel Studios", "Paramount Pictures, Metro-Goldwyn-Mayer").')
-get_parser.add_argument('-pl', '--plot', type=str, help='Provide a string of text to match against movie plot summaries. For example, putting "ghost" will likely select ghost movies, and putting "affair" will likely select movies involving romantic affairs.')
+# The filters shared by get and stats
+filter_parser = argparse.ArgumentParser(add_help=False)
+filter_parser.add_argument('-r', '--rank', type=str, help='Provide rank requirements for your selection (e.g. 1000-, 50-100, 42).')
+filter_parser.add_argument('-t100', '--top100', action='store_true', help='Limit selection to movies in the top 100 of its decade.')
+filter_parser.add_argument('-d', '--director', type=str, help='Provide a director or a list of directors whose movies you want to select from (e.g. "Steven Spielberg", "Hitchcock").')
+filter_parser.add_argument('-rt', '--runtime', type=str, help='Provide movie runtime requirements for your selection (e.g. 90-120, 90+, 60-).')
+filter_parser.add_argument('-g', '--genre', type=str, help='Provide a genre or a list of genres to select a movie from (e.g. "Drama" or "Horror, Musical").')
+filter_parser.add_argument('-y', '--year', type=str, help='Provide a decade, a year range, a year, or a combination of these to select a movie from (e.g. "2010s", "2010-2018", "1994", "2010-2014, 2015").')
+filter_parser.add_argument('-cou', '--country', type=str, help='Provide a country or a list of countries that you want to limit your selected movies to (e.g. "United States", "France").')
+filter_parser.add_argument('-l', '--language', type=str, help='Provide a language or a list of languages that you want to limit your selected movies to (e.g. "English", "Spanish").')
+filter_parser.add_argument('-col', '--color', type=int, help='Limit selection to movies that are either black and white or in color. For black and white put 0, for color put 1.')
+filter_parser.add_argument('-s', '--silent', type=int, help='Limit selection to movies that are silent or non-silent. For silent put 1, for non-silent put 0.')
+filter_parser.add_argument('-rat', '--rating', type=str, help='Provide movie rating requirements for your selection (e.g. 7.0-7.4, 9+, 5.4-).')
+filter_parser.add_argument('-v', '--votes', type=str, help='Provide movie vote count requirements for your selection (e.g. 10000+, 250000-500000, 100-).')
+filter_parser.add_argument('-a', '--actor', type=str, help='Provide an actor or a list of actors that you want to limit your selected movies to (e.g. "James Stewart", "Zendaya, Tom Cruise").')
+filter_parser.add_argument('-w', '--writer', type=str, help='Provide a writer or a list of writers that you want to limit your selected movies to (e.g. "Stan Lee", "Dan Aykroyd, Ernest Lehman").')
+filter_parser.add_argument('-p', '--producer', type=str, help='Provide an actor or a list of actors that you want to limit your selected movies to (e.g. "Kevin Feige", "Ivan Reitman, Robert Wise").')
+filter_parser.add_argument('-cin', '--cinematographer', type=str, help='Provide a cinematographer or a list of cinematographers that you want to limit your selected movies to (e.g. "Matthew Libatique", "Laszlo Kovacs, Ted McCord").')
+filter_parser.add_argument('-e', '--editor', type=str, help='Provide an editor or a list of editors that you want to limit your selected movies to (e.g. "William Reynolds", "Dan Lebental, Sheldon Kahn").')
+filter_parser.add_argument('-com', '--composer', type=str, help='Provide a composer or a list of composers that you want to limit your selected movies to (e.g. "Hans Zimmer", "Danny Elfman, John Williams").')
+filter_parser.add_argument('-pc', '--production_company', type=str, help='Provide a production company or a list of production companies that you want to limit your selected movies to (e.g. "Marvel Studios", "Paramount Pictures, Metro-Goldwyn-Mayer").')
+filter_parser.add_argument('-x', '--exact', action='store_true', help='Match the names given to the director, genre, country, language, cast and crew filters whole instead of as parts of names, so "Tom Hanks" does not also match "Tom Hanks Jr.". Names are still matched regardless of case.')
+filter_parser.add_argument('--fuzzy', action='store_true', help='Also match names similar to the ones given to the director, genre, country, language, cast and crew filters, so misspelled or accented names (e.g. "Kurosowa", "Almodóvar") still find their movies.')
+filter_parser.add_argument('-pl', '--plot', type=str, help='Provide words to match against movie plot summaries. For example, putting "ghost" will likely select ghost movies, and putting "affair" will likely select movies involving romantic affairs. Whole words are matched regardless of their ending, so "haunt" matches "haunted" but "ghost" does not match "ghostwriter".')
+
+get_parser = subparsers.add_parser("get", parents=[filter_parser], help='Retrieve a random movie based on filters.')
+get_parser.add_argument('-rel', '--relevance', action='store_true', help='With -pl, favor the movies whose plots match best: picks are weighted by match quality and "-c all" lists the best matches first.')
+get_parser.add_argument('-wt', '--weight', type=str, help='Favor some movies when picking: rating, votes, rank (better ranks are favored), or an expression over Rank, Decade_Rank, Runtime, Year, Rating and Votes (e.g. "Rating * Votes"). With "-c all", the most favored movies are listed first.')
 get_parser.add_argument('-c', '--count', type=str, help='Provide a number of movies that you want to receive. If you want every movie that follows your requirements, put all.')
+get_parser.add_argument('--session', type=str, help='Name a session to page through the movies matching your filters without repeats: every call with the same session name and filters hands out the next movies of one shuffle, skipping movies removed from the pool meanwhile. Once every movie has come up, the session starts over in a new order.')
+get_parser.add_argument('--seed', type=int, help='Seed the random picks (or the shuffle of a new session), so the same seed and filters give the same movies.')
 get_parser.add_argument('-m', '--minimal', action='store_true', help='Limit the output to only the title and year of release.')
+get_parser.add_argument('--format', type=str, choices=['jsonl', 'tsv', 'csv'], help='Print the movies as JSON lines, TSV or CSV (with every column) for use by other tools.')
+get_parser.add_argument('--timings', nargs='?', const='table', choices=['table', 'json'], help='After the movies, report how long loading, filtering, picking and printing took, as a table (default) or as JSON.')
+get_parser.add_argument('--explain', nargs='?', const='table', choices=['table', 'json'], help='Like --timings, and also report how long every filter took and how many movies were left after it (and the query plan on movies.db).')
 
-remove_parser = subparsers.add_parser("remove", help='Remove a movie from the pool given its ID.')
-remove_parser.add_argument('movie_id', type=int, help='Remove a movie from the selection pool by providing the ID of the movie.')
+remove_parser = subparsers.add_parser("remove", help='Remove movies from the pool given their IDs.')
+remove_parser.add_argument('movie_ids', nargs='*', help='Remove movies from the selection pool by providing their IDs. Use - to read IDs from standard input.')
+remove_parser.add_argument('-f', '--file', type=str, help='Read IDs to remove from a file (whitespace or comma separated).')
 
-list_parser = subparsers.add_parser("list", help='List the movies that have been removed from the selection pool.')
+restore_parser = subparsers.add_parser("restore", help='Return removed movies to the pool given their IDs.')
+restore_parser.add_argument('movie_ids', nargs='*', help='Return movies to the selection pool by providing their IDs. Use - to read IDs from standard input.')
+restore_parser.add_argument('-f', '--file', type=str, help='Read IDs to restore from a file (whitespace or comma separated).')
 
-reset_parser = subparsers.add_parser("reset", help='Reset the pool of movies to select from.')
+stats_parser = subparsers.add_parser("stats", parents=[filter_parser], help='Count the movies left in the pool and those removed, by decade, genre, language, country and rank band.')
+stats_parser.add_argument('--format', type=str, choices=['json', 'tsv'], help='Print the counts as JSON or as TSV lines (dimension, value, remaining, removed) for use by other tools.')
 
-movies = pd.read_csv(csv_path)
-args = parser.parse_args()
-
-
-def build_text_filter_query(command, column):
-    """
-    Build a pandas query string for text-based filtering with AND/OR logic.
-    Supports: comma for AND, semicolon for OR, ! for negation
-    Example: "Nolan, Zimmer; Spielberg" = (Nolan AND Zimmer) OR Spielberg
-    """
-    comm = [command.split(',') for command in command.split(';')]
-
-    for i in range(len(comm)):
-        for j in range(len(comm[i])):
-            c = comm[i][j].strip()
+list_parser = subparsers.add_parser("list", help='List the movies that have been removed from the selection pool.')
 
-            if c.startswith('!'):
-                comm[i][j] = f"~{column}.str.contains('{c[1:]}', case=False, na=False)"
-            else:
-                comm[i][j] = f"{column}.str.contains('{c}', case=False, na=False)"
+reset_parser = subparsers.add_parser("reset", help='Reset the pool of movies to select from.')
 
-    for i in range(len(comm)):
-        comm[i] = " & ".join(comm[i])
+serve_parser = subparsers.add_parser("serve", help='Keep the catalog loaded in memory; other movie commands are forwarded to it while it runs.')
 
-    comm = " | ".join(comm)
+db_parser = subparsers.add_parser("db", help='Move the catalog and pool into a SQLite database (used instead of movies.csv from then on) or back out of it.')
+db_parser.add_argument('action', choices=['import', 'export'], help='import builds movies.db from movies.csv and the pool; export writes movies.db back as a CSV (delete movies.db afterwards to go back to using the CSV).')
+db_parser.add_argument('-o', '--output', type=str, help='Where export writes the CSV (movies.csv by default).')
+db_parser.add_argument('--force', action='store_true', help='Let import replace an existing movies.db, discarding its pool changes.')
 
-    return comm
+# Everything loaded from disk is cached here, so `movie serve` only reloads what
+# changed between requests
+catalog = {}
 
 
-def get_top_cast_members(cast):
-    """Extract up to 5 top-billed cast members from the cast string"""
-    if len(cast) > 1:
-        return re.match(r'^[^,]+,?(?:[^,]+)?,?(?:[^,]+)?,?(?:[^,]+)?,?(?:[^,]+)?', cast).group()
+def load_state(needs_movies=False):
+    """
+    Load the catalog and pool state into `catalog`, refreshing whatever changed on disk.
+    The pandas frame is only loaded for commands that filter (needs_movies).
+    With a SQLite catalog, only a connection to it is kept.
+    """
+    if os.path.exists(database_path):
+        # A re-import replaces the file, which the open connection would not see
+        inode = os.stat(database_path).st_ino
+        if catalog.get('database_inode') != inode:
+            from movie_db import connect
+            close_database()
+            catalog['database'] = connect(database_path)
+            catalog['database_inode'] = inode
+        return
+    close_database()
+
+    signature = get_source_signature(csv_path)
+    if catalog.get('signature') != signature:
+        catalog.clear()
+        catalog['signature'] = signature
+        catalog['light'] = load_light_catalog(csv_path)
+
+    if needs_movies and 'movies' not in catalog:
+        from movie_catalog import load_catalog
+        catalog['movies'], catalog['credits'], catalog['version'] = load_catalog(csv_path)
+
+    journal_signature = get_journal_signature(csv_path)
+    if 'removed' not in catalog or catalog['journal'] != journal_signature:
+        # The CSV is never rewritten; removals live in a journal replayed over it
+        catalog['removed'] = load_pool_state(csv_path, catalog['light'])
+        catalog['journal'] = journal_signature
+        catalog.pop('pooled', None)
+
+    if needs_movies and 'pooled' not in catalog:
+        from movie_pool import apply_pool_state
+        catalog['pooled'] = apply_pool_state(catalog['movies'], catalog['removed'])
+
+
+def close_database():
+    """Drop everything loaded so far, closing the SQLite catalog if it was open"""
+    if 'database' in catalog:
+        catalog['database'].close()
+        catalog.clear()
+
+
+def load_results():
+    """Load the index of cached filter results on first use and keep it in `catalog`"""
+    if 'results' not in catalog:
+        from movie_results import load_result_index
+        catalog['results'] = load_result_index(csv_path, catalog['version'])
+    return catalog['results']
+
+
+def load_session(name):
+    """Load a session of get --session; None when there is none by that name (or the catalog changed since)"""
+    if 'database' in catalog:
+        from movie_db import load_session as load_database_session
+        return load_database_session(catalog['database'], name)
+
+    from movie_sessions import load_session as load_csv_session
+    return load_csv_session(csv_path, catalog['version'], name)
+
+
+def save_session(name, session, cursor_only=False):
+    """Store a session of get --session; cursor_only when only its cursor moved"""
+    if 'database' in catalog:
+        from movie_db import save_session as save_database_session
+        save_database_session(catalog['database'], name, session, cursor_only)
+        return
+
+    from movie_sessions import save_session as save_csv_session
+    save_csv_session(csv_path, catalog['version'], name, session, cursor_only)
+
+
+def load_stats():
+    """
+    Load the groups counted by `movie stats` on first use and keep them in `catalog`,
+    along with their removed counts brought up to date with the pool.
+    Returns: (stats, counts) - see movie_stats.build_stats and movie_stats.update_removed_counts
+    """
+    from movie_catalog import load_catalog, load_sidecar
+    import movie_stats
+
+    version = catalog['light']['sha1']
+    if 'stats' not in catalog:
+        catalog['stats'] = load_sidecar(csv_path, 'stats', version,
+                                        lambda: movie_stats.build_stats(catalog['movies'] if 'movies' in catalog else load_catalog(csv_path)[0]))
+        catalog['pool_stats'] = movie_stats.load_removed_counts(csv_path, version, catalog['stats'])
+
+    # Only the journal entries added since the counts were saved are read and looked up
+    counts = catalog['pool_stats']
+    entries, offset, tail, restarted = read_journal_since(csv_path, counts['offset'], counts['tail'])
+    changed = movie_stats.update_removed_counts(catalog['stats'], counts, entries, catalog['light']['removed'] if restarted else None)
+    if changed or offset != counts['offset']:
+        counts['offset'], counts['tail'] = offset, tail
+        movie_stats.save_removed_counts(csv_path, version, counts)
+    return catalog['stats'], counts
+
+
+def load_index(kind, column):
+    """
+    Load an index on first use and keep it in `catalog`; None for columns without one.
+    kind is 'text' (names), 'fuzzy' (name trigrams), 'words' (plot), 'numeric' (sorted ranges),
+    'values' (categories) or 'credits' (the interned credits of a column, loaded with the catalog).
+    """
+    from movie_catalog import load_sidecar
+    import movie_index
+
+    if kind == 'credits':
+        return catalog['credits'].get(column)
+    if kind == 'text':
+        if column not in movie_index.TEXT_INDEX_COLUMNS:
+            return None
+        sidecar, build = 'text', lambda: movie_index.build_text_index(catalog['movies'], catalog['credits'])
+    elif kind == 'fuzzy':
+        if column not in movie_index.TEXT_INDEX_COLUMNS:
+            return None
+        # Built over the vocabulary of the text index
+        load_index('text', column)
+        sidecar, build = 'fuzzy', lambda: movie_index.build_fuzzy_indexes(catalog['text'], catalog['movies'], catalog['credits'])
+    elif kind == 'words':
+        sidecar, build = 'plot', lambda: movie_index.build_plot_index(catalog['movies']['Plot'])
+    elif kind == 'numeric' and column in movie_index.NUMERIC_INDEX_COLUMNS:
+        sidecar, build = 'numeric', lambda: movie_index.build_numeric_index(catalog['movies'])
+    elif kind == 'values' and column in movie_index.VALUE_INDEX_COLUMNS:
+        sidecar, build = 'numeric', lambda: movie_index.build_numeric_index(catalog['movies'])
     else:
-        return '-'
-    
+        return None
 
-def format_runtime(minutes):
-    """Convert minutes to 'Xh Ym' format"""
-    if minutes == '-':
-        return '-'
-    minutes = int(minutes)
-    hours = minutes // 60
-    mins = minutes % 60
-    return f'{hours}h {mins}m'
+    if sidecar not in catalog:
+        catalog[sidecar] = load_sidecar(csv_path, sidecar, catalog['version'], build)
+    index = catalog[sidecar]
 
+    if kind in ('text', 'fuzzy'):
+        return index[column]
+    if kind == 'numeric':
+        return index['columns'][column]
+    if kind == 'values':
+        return index['tables'][column]
+    return index
 
-def get_rating_color(rating):
-    """Get color code for rating"""
-    try:
-        rating = float(rating)
-        if rating >= 8.0:
-            return '\033[92m'  # Green
-        elif rating >= 7.0:
-            return '\033[93m'  # Yellow
-        else:
-            return '\033[37m'  # White
-    except:
-        return '\033[37m'
 
+def similar_names(column, term, limit):
+    """The names of a column most similar to term, best first, as written in the catalog"""
+    from movie_index import lookup_similar
 
-def get_rank_color(rank):
-    """Get color code for rank"""
-    try:
-        rank = int(rank)
-        if rank <= 100:
-            return '\033[92m'  # Green
-        elif rank <= 500:
-            return '\033[93m'  # Yellow
-        else:
-            return '\033[37m'  # White
-    except:
-        return '\033[37m'
+    fuzzy_index = load_index('fuzzy', column)
+    if fuzzy_index is None:
+        return []
+    return [fuzzy_index['display'][name_id] for name_id in lookup_similar(fuzzy_index, term, limit).tolist()]
 
 
-def format_votes(votes):
-    """Format vote count with thousands separator"""
+def read_id_file(path):
+    """Read a file of movie IDs, printing why when it can't be read. Returns: its text or None"""
     try:
-        votes = int(votes)
-        return f'{votes:,}'
-    except:
-        return votes
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError) as error:
+        print(f"Couldn't read {path} ({getattr(error, 'strerror', None) or error}). Please try again.")
+        return None
 
 
-def get_rank_badge(rank):
-    """Get badge for top-ranked movies"""
-    try:
-        rank = int(rank)
-        if rank <= 10:
-            return ' \033[1;93m★\033[0m'
-        elif rank <= 50:
-            return ' \033[93m★\033[0m'
-        elif rank <= 100:
-            return ' \033[90m★\033[0m'
+def collect_movie_ids(args, stdin=None):
+    """
+    Gather movie IDs from the arguments, the --file flag and standard input ("-").
+    stdin is the text already read from standard input, if any.
+    Returns: (ids, invalid) - ids in the order given, invalid holds tokens that are not IDs;
+    both are None when the file can't be read
+    """
+    tokens = [token for token in args.movie_ids if token != '-']
+    if '-' in args.movie_ids or args.file == '-':
+        tokens += re.split(r'[\s,]+', sys.stdin.read() if stdin is None else stdin)
+    if args.file and args.file != '-':
+        text = read_id_file(args.file)
+        if text is None:
+            return None, None
+        tokens += re.split(r'[\s,]+', text)
+
+    ids, invalid = [], []
+    for token in filter(None, tokens):
+        if token.isdigit():
+            ids.append(int(token))
         else:
-            return ''
-    except:
-        return ''
+            invalid.append(token)
+    return ids, invalid
 
 
-def format_movie_output(choice, minimal=False, pool_size=0, is_last=False):
-    """Format a movie's information for display"""
-    if minimal:
-        return f"{choice['Title']} \033[90m({choice['Year']})\033[0m"
-    else:
-        rating_color = get_rating_color(choice['Rating'])
-        rank_color = get_rank_color(choice['Rank'])
-        rank_badge = get_rank_badge(choice['Rank'])
-        votes_formatted = format_votes(choice['Votes'])
-        
-        bottom_separator = f"\n\033[90m{'─' * 60}\033[0m" if is_last else ""
-        
-        return (f"\n\033[90m{'─' * 60}\033[0m\n"
-                f"\033[90mMovie:\033[0m \033[1m{choice['Title']}\033[0m \033[90m({choice['Year']})\033[0m{rank_badge} ({rating_color}{choice['Rating']}\033[0m, {votes_formatted} votes, Rank {rank_color}#{choice['Rank']}\033[0m) [{pool_size} total]\n"
-                f"\033[90mDirector:\033[0m {choice['Director']}\n"
-                f"\033[90mGenre:\033[0m {choice['Genre']}\n"
-                f"\033[90mRuntime:\033[0m {format_runtime(choice['Runtime'])}\n"
-                f"\033[90mStarring:\033[0m {get_top_cast_members(choice['Cast'])}\n"
-                f"\033[90mPlot:\033[0m {choice['Plot']}\n"
-                f"\033[90mID:\033[0m {choice['ID']}"
-                f"{bottom_separator}")
-
-
-def parse_numeric_range(arg_string, column_name, allow_decimal=False):
+def change_pool(args, action, stdin=None):
     """
-    Parse numeric range arguments and return a pandas query string.
-    Supports: ranges (100-200), at-least (100+), at-most (100-), exact (100)
-    Returns: (query_string, error_message) - error_message is None on success
+    Remove or restore every requested movie with a single journal write (or SQLite transaction).
+    The IDs are resolved with hash lookups against the catalog's ID column.
     """
-    args = [arg.strip() for arg in arg_string.split(',')]
-    conditions = []
-    
-    if allow_decimal:
-        range_pattern = r'(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)'
-        single_pattern = r'\d+(?:\.\d+)?'
-        modifier_pattern = r'\d+(?:\.\d+)?[\-+]'
+    ids, invalid = collect_movie_ids(args, stdin)
+    if ids is None:
+        return
+    if not ids and not invalid:
+        print(f"Provide at least one movie ID to {action}.")
+        return
+
+    date = str(datetime.now())
+    if 'database' in catalog:
+        from movie_db import change_pool as change_database_pool
+        entries, unchanged, missing = change_database_pool(catalog['database'], action, ids, date)
     else:
-        range_pattern = r'(\d+)-(\d+)'
-        single_pattern = r'\d+'
-        modifier_pattern = r'\d+[\-+]'
-    
-    for arg in args:
-        if rng := re.fullmatch(range_pattern, arg):
-            start, end = rng.group(1), rng.group(2)
-            conditions.append(f"{column_name} >= {start} & {column_name} <= {end}")
-        elif re.fullmatch(modifier_pattern, arg):
-            value = float(arg[:-1]) if allow_decimal else int(arg[:-1])
-            if arg[-1] == '-':
-                conditions.append(f"{column_name} <= {value} & {column_name} >= 0")
-            elif arg[-1] == '+':
-                conditions.append(f"{column_name} >= {value} & {column_name} >= 0")
-        elif re.fullmatch(single_pattern, arg):
-            conditions.append(f"{column_name} == {arg}")
+        removed = catalog['removed']
+        if 'ids' not in catalog:
+            catalog['ids'] = set(catalog['light']['ID'])
+        catalog_ids = catalog['ids']
+        entries, unchanged, missing = [], [], []
+
+        for movie_id in ids:
+            if movie_id not in catalog_ids:
+                missing.append(movie_id)
+            elif (action == 'remove') == (movie_id in removed):
+                unchanged.append(movie_id)
+            else:
+                entry = (action, movie_id, date)
+                entries.append(entry)
+                replay_pool_journal(removed, [entry])
+
+        if entries:
+            record_pool_changes(csv_path, entries, removed, catalog['light'])
+
+    # A single ID keeps the original one-line messages
+    if len(ids) == 1 and not invalid:
+        if entries:
+            print(f"Movie with ID {ids[0]} has been {action}d.")
+        elif unchanged:
+            print("That movie has already been removed from the pool." if action == 'remove' else "That movie is already in the pool.")
         else:
-            return None, f"Invalid {column_name.lower()} format: '{arg}'"
-    
-    return " | ".join(conditions), None
+            print(f"No movie found with ID {ids[0]}.")
+        return
+
+    print(f"{action.capitalize()}d {len(entries)} movie{'s' if len(entries) != 1 else ''}.")
+    if unchanged:
+        state = "Already removed from the pool" if action == 'remove' else "Already in the pool"
+        print(f"{state} ({len(unchanged)}): {', '.join(map(str, unchanged))}")
+    if missing:
+        print(f"No movie found ({len(missing)}): {', '.join(map(str, missing))}")
+    if invalid:
+        print(f"Invalid IDs ({len(invalid)}): {', '.join(invalid)}")
 
 
-def parse_year_range(arg_string):
+def format_report(stages, trace, style, query_plan=None):
     """
-    Parse year arguments supporting decades, ranges, exact years, and modifiers.
-    Returns: (query_string, error_message) - error_message is None on success
+    Format the get --timings/--explain report.
+    stages are (stage, seconds, rows), trace the per-filter entries from evaluate (or None)
+    and query_plan the EXPLAIN QUERY PLAN lines of the SQLite catalog (or None).
     """
-    year_args = [arg.strip() for arg in arg_string.split(',')]
-    conditions = []
-
-    for arg in year_args:
-        if re.fullmatch(r'\d{4}s', arg):  # e.g., "1980s"
-            conditions.append(f"Decade == '{arg}'")
-        elif rng := re.fullmatch(r'(\d{4})-(\d{4})', arg):  # e.g., "1980-1989"
-            start, end = rng.group(1), rng.group(2)
-            conditions.append(f"Year >= {start} & Year <= {end}")
-        elif re.fullmatch(r'\d{4}[\-+]', arg):  # e.g., "2000+", "1999-"
-            year_val = arg[:-1]
-            if arg[-1] == '-':
-                conditions.append(f"Year <= {year_val}")
-            elif arg[-1] == '+':
-                conditions.append(f"Year >= {year_val}")
-        elif re.fullmatch(r'\d{4}', arg):  # e.g., "1994"
-            conditions.append(f"Year == {arg}")
+    total = sum(seconds for _, seconds, _ in stages)
+    if style == 'json':
+        import json
+        report = {'stages': [{'stage': stage, 'seconds': round(seconds, 6), 'rows': rows} for stage, seconds, rows in stages],
+                  'total_seconds': round(total, 6)}
+        if trace is not None:
+            report['filters'] = [dict(entry, seconds=round(entry['seconds'], 6)) if 'seconds' in entry else entry for entry in trace]
+        if query_plan is not None:
+            report['query_plan'] = query_plan
+        return json.dumps(report)
+
+    lines = [f"\033[90m{'Stage':<44} {'Time (ms)':>10} {'Rows':>12}\033[0m"]
+    for stage, seconds, rows in stages:
+        lines.append(f"{stage:<44} {seconds * 1000:10.2f} {rows:>12,}")
+        if stage == 'filter' and trace is not None:
+            for entry in trace:
+                name = f"  {entry['filter']}"
+                name = name if len(name) <= 44 else name[:41] + '...'
+                if entry.get('skipped'):
+                    lines.append(f"{name:<44} {'skipped':>10}")
+                else:
+                    lines.append(f"{name:<44} {entry['seconds'] * 1000:10.2f} {entry['rows_in']:>12,} -> {entry['rows_out']:,}")
+    lines.append(f"{'total':<44} {total * 1000:10.2f}")
+    if query_plan is not None:
+        lines.append("\033[90mQuery plan\033[0m")
+        lines.extend(f'  {line}' for line in query_plan)
+    return '\n'.join(lines)
+
+
+def get_movies(args, load_seconds=0.0):
+    """Pick random movies matching the get filters and print them"""
+    import numpy as np
+    from movie_filters import TEXT_FILTERS, compile_filters, expand_fuzzy, find_suggestions, positive_terms
+    from movie_render import render_chunks, render_movies
+    from movie_sampling import WEIGHT_COLUMNS, get_weights, uniform_sample, weighted_sample
+
+    database = catalog.get('database')
+    tree, error = compile_filters(args)
+    if error:
+        print(error)
+        return
+    if args.seed is not None and args.seed < 0:
+        print("The seed must be a positive integer or 0. Please try again.")
+        return
+
+    if database is None:
+        from movie_filters import evaluate
+        similar = similar_names
+
+        def matches_any(leaf):
+            return evaluate(leaf, catalog['pooled'], load_index).any()
+    else:
+        from movie_db import matches_any as database_matches_any, similar_names as database_similar_names
+
+        def similar(column, term, limit):
+            return database_similar_names(database, column, term, limit)
+
+        def matches_any(leaf):
+            return database_matches_any(database, leaf)
+
+    # --fuzzy terms also match the names most similar to them
+    compiled = tree
+    tree = expand_fuzzy(tree, similar)
+
+    # Stage timings for --timings/--explain: (stage, seconds, rows left)
+    if database is None:
+        movies = catalog['pooled']
+        stages = [('load', load_seconds, len(movies))]
+    else:
+        from movie_db import read_meta
+        stages = [('load', load_seconds, int(read_meta(database, 'rows')))]
+    clock = [time.perf_counter()]
+
+    def mark(stage, rows):
+        now = time.perf_counter()
+        stages.append((stage, now - clock[0], rows))
+        clock[0] = now
+
+    trace = None
+    query_plan = None
+    session = None
+    if args.session:
+        from movie_filters import canonicalize
+
+        # A session goes on while it is asked for with the same filters and way of favoring movies
+        session_key = repr((canonicalize(compiled), args.weight, bool(args.relevance and args.plot)))
+        session = load_session(args.session)
+        if session is not None and (session['key'] != session_key or args.seed not in (None, session['seed'])):
+            print(f'Session "{args.session}" was started with other filters or another seed; starting it over.', file=sys.stderr if args.format else sys.stdout)
+            session = None
+        created = session is None
+
+    if session is not None:
+        # Picks come from the stored shuffle, so the filters don't run again
+        mark('session', len(session['movies']))
+    elif database is None:
+        from movie_filters import canonicalize, plan
+        from movie_results import load_result, remember_result, save_result_index
+
+        # Only row positions are kept; rows are gathered for the chosen movies alone.
+        # --fuzzy terms are keyed as typed, since they expand the same way for a catalog version
+        key = repr(canonicalize(compiled))
+        results = load_results()
+        # --explain runs the filters again, since a cached result has no per-filter report
+        matches = load_result(csv_path, results, key) if tree[1] and not args.explain else None
+        if not tree[1]:
+            matches = np.arange(len(movies))
+            mark('filter', len(matches))
+        elif matches is not None:
+            # Only the index is rewritten, to keep the least recently used order
+            if next(reversed(results)) != key:
+                results.move_to_end(key)
+                save_result_index(csv_path, catalog['version'], results)
+            mark('cached filter', len(matches))
         else:
-            return None, f"Invalid year format: '{arg}'"
-    
-    return " | ".join(conditions), None
-
-
-# Main command logic
-if args.command == "get":
-    movie_choices = movies
-    
-    # Apply rank filter
-    if args.rank:
-        conditions, error = parse_numeric_range(args.rank, 'Rank')
-        if error:
-            print(f"{error}\nValid formats: 50-100 (range), 1000- (up to), 42+ (at least), 42 (exact)")
-            quit()
-        movie_choices['Rank'] = pd.to_numeric(movie_choices['Rank'], errors='coerce').fillna(-1).astype(int)
-        movie_choices = movie_choices.query(conditions)
-
-    # Apply top 100 of decade filter
-    if args.top100:
-        movie_choices['Decade_Rank'] = pd.to_numeric(movie_choices['Decade_Rank'], errors='coerce').fillna(-1).astype(int)
-        movie_choices = movie_choices.query('Decade_Rank <= 100 & Decade_Rank > 0')
-
-    # Apply director filter
-    if args.director:
-        movie_choices = movie_choices.query(build_text_filter_query(args.director, "Director"))
-
-    # Apply runtime filter
-    if args.runtime:
-        conditions, error = parse_numeric_range(args.runtime, 'Runtime')
-        if error:
-            print(f"{error}\nValid formats: 90-120 (range), 60- (up to), 90+ (at least), 95 (exact)")
-            quit()
-        movie_choices['Runtime'] = pd.to_numeric(movie_choices['Runtime'], errors='coerce').fillna(-1).astype(int)
-        movie_choices = movie_choices.query(conditions)
-
-    # Apply genre filter
-    if args.genre:
-        movie_choices = movie_choices.query(build_text_filter_query(args.genre, "Genre"))
-
-    # Apply year filter
-    if args.year:
-        conditions, error = parse_year_range(args.year)
+            # Cheap, selective filters run first and later ones only look at the rows left
+            tree = plan(tree, movies, load_index)
+            mark('plan', len(movies))
+
+            trace = [] if args.explain else None
+            matches = np.flatnonzero(evaluate(tree, movies, load_index, trace)).astype(np.int32)
+            mark('filter', len(matches))
+            remember_result(csv_path, catalog['version'], results, key, matches)
+
+        # Results are cached before the pool is applied, so removals never invalidate them
+        pool = matches[movies['In_Pool'].to_numpy()[matches] == "Y"]
+        mark('pool', len(pool))
+        # A new session shuffles every match, so movies returned to the pool later still come up in it
+        candidates = matches if args.session else pool
+        weight_columns, weight_positions = movies, candidates
+    else:
+        from movie_db import select_matches
+
+        # The filters run as one SQL query; matches and pool hold rowids rather than row positions
+        matches, pooled, weight_columns = select_matches(database, tree, WEIGHT_COLUMNS if args.weight else ())
+        mark('filter', len(matches))
+        if args.explain:
+            from movie_db import explain_matches
+
+            # The per-filter counts are extra queries, timed as a stage of their own
+            trace, query_plan = explain_matches(database, tree)
+            mark('explain', len(matches))
+        pool = matches[pooled]
+        mark('pool', len(pool))
+        candidates = matches if args.session else pool
+        weight_positions = np.arange(len(matches)) if args.session else np.flatnonzero(pooled)
+
+    # Weights bias the picks and order "-c all" (heaviest first)
+    weights = None
+    if args.weight and session is None:
+        weights, error = get_weights(weight_columns, weight_positions, args.weight)
         if error:
-            print(f"{error}\nValid formats: 1980s (decade), 1980-1989 (range), 1994 (exact), 2000+ (after)")
-            quit()
-        movie_choices['Year'] = pd.to_numeric(movie_choices['Year'], errors='coerce').fillna(-1).astype(int)
-        movie_choices = movie_choices.query(conditions)
-    
-    # Apply country filter
-    if args.country:
-        movie_choices = movie_choices.query(build_text_filter_query(args.country, "Country"))
-
-    # Apply language filter
-    if args.language:
-        movie_choices = movie_choices.query(build_text_filter_query(args.language, "Language"))
-    
-    # Apply color filter
-    if args.color is not None:
-        if args.color == 0:
-            movie_choices = movie_choices.query('Color == "FALSE"')
-        elif args.color == 1:
-            movie_choices = movie_choices.query('Color == "TRUE"')
+            print(error)
+            return
+    if args.relevance and args.plot and session is None:
+        if database is None:
+            from movie_index import score_documents
+            scores = score_documents(load_index('words', 'Plot'), positive_terms(args.plot))[candidates]
         else:
-            print("The color flag only takes 1 (color) or 0 (black & white). Please try again.")
-            quit()
-
-    # Apply silent filter
-    if args.silent is not None:
-        if args.silent == 0:
-            movie_choices = movie_choices.query('Silent == "FALSE"')
-        elif args.silent == 1:
-            movie_choices = movie_choices.query('Silent == "TRUE"')
+            from movie_db import score_plots
+            scores = score_plots(database, positive_terms(args.plot), candidates)
+        weights = scores if weights is None else weights * scores
+    if weights is not None and not weights.any():
+        weights = None
+    if (args.weight or args.relevance) and session is None:
+        mark('weights', len(candidates))
+
+    # --seed makes the picks (or the shuffle of a new session) reproducible
+    random_state = random.Random(args.seed)
+    numpy_random_state = np.random.default_rng(args.seed)
+
+    def pick(count):
+        if weights is None:
+            return uniform_sample(len(pool), count, random_state)
+        return weighted_sample(weights, count, numpy_random_state)
+
+    finished = False
+    if args.session:
+        from movie_sessions import create_session, new_seed, take_from_session
+        if session is None:
+            session = create_session(session_key, candidates, new_seed() if args.seed is None else args.seed, weights)
+        if args.count and args.count != 'all' and not (re.fullmatch(r'\d+', args.count) and int(args.count) > 0):
+            print("Either a positive integer or \"all\" must be provided for the count flag. Please try again.")
+            return
+
+        # The next movies of the session's shuffle that are still in the pool; "-c all" hands out the rest of the round
+        if database is None:
+            pooled = movies['In_Pool'].to_numpy()
+
+            def in_pool(batch):
+                return pooled[batch] == "Y"
         else:
-            print("The silent flag only takes 1 (silent) or 0 (non-silent). Please try again.")
-            quit()
-
-    # Apply rating filter
-    if args.rating:
-        conditions, error = parse_numeric_range(args.rating, 'Rating', allow_decimal=True)
-        if error:
-            print(f"{error}\nValid formats: 7.0-8.0 (range), 7.5- (up to), 7.9+ (at least), 7.9 (exact)")
-            quit()
-        movie_choices['Rating'] = pd.to_numeric(movie_choices['Rating'], errors='coerce').fillna(-1.0)
-        movie_choices = movie_choices.query(conditions)
-
-    # Apply votes filter
-    if args.votes:
-        conditions, error = parse_numeric_range(args.votes, 'Votes')
-        if error:
-            print(f"{error}\nValid formats: 5000-15000 (range), 100- (up to), 100000+ (at least), 100 (exact)")
-            quit()
-        movie_choices['Votes'] = pd.to_numeric(movie_choices['Votes'], errors='coerce').fillna(-1).astype(int)
-        movie_choices = movie_choices.query(conditions)
-
-    # Apply actor filter
-    if args.actor:
-        movie_choices = movie_choices.query(build_text_filter_query(args.actor, "Cast"))
-
-    # Apply writer filter
-    if args.writer:
-        movie_choices = movie_choices.query(build_text_filter_query(args.writer, "Writer"))
-
-    # Apply producer filter
-    if args.producer:
-        movie_choices = movie_choices.query(build_text_filter_query(args.producer, "Producer"))
-
-    # Apply cinematographer filter
-    if args.cinematographer:
-        movie_choices = movie_choices.query(build_text_filter_query(args.cinematographer, "Cinematographer"))
-
-    # Apply editor filter
-    if args.editor:
-        movie_choices = movie_choices.query(build_text_filter_query(args.editor, "Editor"))
-
-    # Apply composer filter
-    if args.composer:
-        movie_choices = movie_choices.query(build_text_filter_query(args.composer, "Composer"))
-
-    # Apply production company filter
-    if args.production_company:
-        movie_choices = movie_choices.query(build_text_filter_query(args.production_company, "Production_Company"))
-
-    # Apply plot filter
-    if args.plot:
-        movie_choices = movie_choices.query(build_text_filter_query(args.plot, "Plot"))
-
-    # Filter to only movies in the pool
-    movie_choices_pool = movie_choices.query('In_Pool == "Y"')
-    
-    if movie_choices_pool.empty:
-        print("No movies match your criteria.")
-    else:
+            from movie_db import in_pool as database_in_pool
+
+            def in_pool(batch):
+                return database_in_pool(database, batch)
+        round_number = session['round']
+        picked, finished = take_from_session(session, None if args.count == 'all' else int(args.count or 1), in_pool)
+        save_session(args.session, session, cursor_only=not created and session['round'] == round_number)
+        mark('sample', len(picked))
+        pool_size = len(session['movies'])
+    elif len(pool) > 0:
         # Handle count argument
         if args.count:
             if re.fullmatch(r'\d+', args.count):
                 count = int(args.count)
                 if count <= 0:
                     print("Either a positive integer or \"all\" must be provided for the count flag. Please try again.")
-                    quit()
-                elif count > movie_choices_pool.shape[0]:
-                    print(f"Count ({count}) cannot be larger than available movies ({movie_choices_pool.shape[0]}). Please try again.")
-                    quit()
+                    return
+                elif count > len(pool):
+                    print(f"Count ({count}) cannot be larger than available movies ({len(pool)}). Please try again.")
+                    return
                 else:
-                    choices = movie_choices_pool.sample(count)
+                    chosen = pick(count)
             elif args.count == 'all':
-                choices = movie_choices_pool
+                chosen = np.arange(len(pool)) if weights is None else (-weights).argsort(kind='stable')
             else:
                 print("Either a positive integer or \"all\" must be provided for the count flag. Please try again.")
-                quit()
-        else:
-            choices = movie_choices_pool.sample()
-
-        # Format and display results
-        choices_list = list(choices.iterrows())
-        for idx, (_, choice) in enumerate(choices_list):
-            is_last = (idx == len(choices_list) - 1)
-            print(format_movie_output(choice, minimal=args.minimal, pool_size=len(movie_choices_pool), is_last=is_last))
-        
-        print()  # Single blank line at end
-
-elif args.command == "remove":
-    if args.movie_id in movies["ID"].values:
-        if movies.loc[movies["ID"] == args.movie_id, "In_Pool"].iloc[0] == "Y":
-            movies.loc[movies["ID"] == args.movie_id, ["In_Pool", "Date"]] = ["N", datetime.now()]
-            movies.to_csv(csv_path, index=False)
-            print(f"Movie with ID {args.movie_id} has been removed.")
+                return
         else:
-            print("That movie has already been removed from the pool.")
+            chosen = pick(1)
+        mark('sample', len(chosen))
+        picked, pool_size = pool[chosen], len(pool)
     else:
-        print(f"No movie found with ID {args.movie_id}.")
+        picked = pool
 
-elif args.command == "reset":
-    movies["In_Pool"] = "Y"
-    movies.to_csv(csv_path, index=False)
+    if len(picked) == 0:
+        print("No movies match your criteria.", file=sys.stderr if args.format else sys.stdout)
+        flags = {column: flag for flag, column in TEXT_FILTERS}
+        for column, term, suggestion in find_suggestions(compiled, matches_any, similar):
+            print(f'Nothing matches "{term}" for --{flags[column]}. Did you mean "{suggestion}"?', file=sys.stderr if args.format else sys.stdout)
+    else:
+        # Format and display results, a chunk at a time so large outputs start right away
+        if database is None:
+            output = render_movies(movies, catalog['credits'], picked, style=args.format, minimal=args.minimal, pool_size=pool_size)
+        else:
+            from movie_db import fetch_movies
+            output = render_chunks(fetch_movies(database, picked), style=args.format, minimal=args.minimal, pool_size=pool_size)
+        for text in output:
+            print(text)
+
+        if not args.format:
+            print()  # Single blank line at end
+        mark('render', len(picked))
+        if finished:
+            print(f'Session "{args.session}" has gone through all of its {pool_size} movies; it starts over in a new order next time.', file=sys.stderr if args.format else sys.stdout)
+
+    if args.explain or args.timings:
+        # Keep machine-readable output parseable
+        print(format_report(stages, trace, args.explain or args.timings, query_plan), file=sys.stderr if args.format else sys.stdout)
+
+
+def show_stats(args):
+    """Print how many movies are left in the pool and how many were removed, by decade, genre, language, country and rank band"""
+    from movie_filters import compile_filters, expand_fuzzy
+    from movie_stats import format_stats
+
+    tree, error = compile_filters(args)
+    if error:
+        print(error)
+        return
+
+    database = catalog.get('database')
+    if database is not None:
+        from movie_db import count_stats, similar_names as database_similar_names
+
+        def similar(column, term, limit):
+            return database_similar_names(database, column, term, limit)
+        rows, movies, removed = count_stats(database, expand_fuzzy(tree, similar) if tree[1] else None)
+    elif not tree[1]:
+        # The counts are kept up to date as the pool changes, so no movie is looked at here
+        stats, counts = load_stats()
+        rows = [(dimension, value, total - gone, gone)
+                for (dimension, value), total, gone in zip(stats['labels'], stats['totals'].tolist(), counts['groups'].tolist())]
+        movies, removed = len(stats['ids']), counts['removed']
+    else:
+        import numpy as np
+        from movie_filters import evaluate, plan
+        from movie_stats import count_groups
+
+        load_state(needs_movies=True)
+        pooled = catalog['pooled']
+        tree = plan(expand_fuzzy(tree, similar_names), pooled, load_index)
+        matches = np.flatnonzero(evaluate(tree, pooled, load_index))
+        gone = matches[pooled['In_Pool'].to_numpy()[matches] == "N"]
+        stats, _ = load_stats()
+        rows = [(dimension, value, total - removed, removed)
+                for (dimension, value), total, removed in zip(stats['labels'], count_groups(stats, matches).tolist(), count_groups(stats, gone).tolist())]
+        movies, removed = len(matches), len(gone)
+
+    print(format_stats(rows, movies, removed, args.format))
+
+
+def reset_pool():
+    """Return every movie to the pool"""
+    if 'database' in catalog:
+        from movie_db import reset_pool as reset_database_pool
+        reset_database_pool(catalog['database'])
+    else:
+        entry = ('reset', None, str(datetime.now()))
+        record_pool_changes(csv_path, [entry], replay_pool_journal(catalog['removed'], [entry]), catalog['light'])
     print("The pool has been reset.")
 
-elif args.command == "list":
-    removed_movies = movies.query('In_Pool == "N"')
-    if not removed_movies.empty:
-        removed_movies = removed_movies.sort_values(by="Date", ascending=True)
+
+def list_removed():
+    """List the removed movies in the order they were removed"""
+    if 'database' in catalog:
+        from movie_db import list_removed as list_database_removed
+        removed_list = [f"{movie} ({year} | {date}" for movie, year, date in list_database_removed(catalog['database'])]
+        print("\n".join(removed_list) if removed_list else "There are no movies in the list.")
+        return
+
+    removed = catalog['removed']
+    if removed:
+        light = catalog['light']
+        if 'positions' not in catalog:
+            catalog['positions'] = {movie_id: position for position, movie_id in enumerate(light['ID'])}
+        positions = catalog['positions']
         removed_list = []
-        for _, row in removed_movies.iterrows():
-            movie = row['Title']
-            year = row['Year']
-            date = row['Date']
+        for movie_id, date in sorted(removed.items(), key=lambda item: str(item[1])):
+            position = positions.get(movie_id)
+            if position is None:
+                continue
+            movie = light['Title'][position]
+            year = light['Year'][position]
             removed_list.append(f"{movie} ({year} | {date}")
         print("\n".join(removed_list))
     else:
         print("There are no movies in the list.")
-        
-else:
-    parser.print_help()
\ No newline at end of file
+
+
+def run_command(args, stdin=None):
+    """Run a parsed command in this process (also used by `movie serve` for forwarded commands)"""
+    started = time.perf_counter()
+    load_state(needs_movies=(args.command == "get"))
+
+    if args.command == "get":
+        get_movies(args, load_seconds=time.perf_counter() - started)
+    elif args.command in ("remove", "restore"):
+        change_pool(args, args.command, stdin)
+    elif args.command == "reset":
+        reset_pool()
+    elif args.command == "list":
+        list_removed()
+    elif args.command == "stats":
+        show_stats(args)
+
+
+def manage_database(args):
+    """Import movies.csv and the pool into the SQLite catalog, or export the catalog back to a CSV"""
+    import sqlite3
+    from movie_db import connect, export_catalog, import_catalog
+
+    if args.action == 'import':
+        if os.path.exists(database_path) and not args.force:
+            print(f"{database_path} already exists and holds the current pool. Use --force to rebuild it from {os.path.basename(csv_path)}.")
+            return
+        try:
+            count, removed = import_catalog(csv_path, database_path)
+        except sqlite3.OperationalError as e:
+            # e.g. an SQLite build without FTS5
+            print(f"Could not build {database_path}: {e}")
+            return
+        print(f"Imported {count} movies ({removed} removed from the pool) into {database_path}, which is used from now on.")
+        return
+
+    if not os.path.exists(database_path):
+        print("There is no database to export. Create one with \"movie db import\" first.")
+        return
+    output = os.path.abspath(args.output) if args.output else csv_path
+    connection = connect(database_path)
+    try:
+        count = export_catalog(connection, output)
+    finally:
+        connection.close()
+
+    # The pool state is now in the CSV's own In_Pool/Date columns, so the old journal must not be replayed over it
+    if output == csv_path and os.path.exists(get_journal_path(csv_path)):
+        os.remove(get_journal_path(csv_path))
+    print(f"Exported {count} movies to {output}.")
+
+
+def warm_up():
+    """Load everything a get may need before `movie serve` starts accepting commands"""
+    load_state(needs_movies=True)
+    if 'database' in catalog:
+        return
+    load_index('text', 'Cast')
+    load_index('words', 'Plot')
+    load_index('numeric', 'Rank')
+    load_stats()
+
+
+def main():
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+        return
+
+    if args.command == "serve":
+        from movie_daemon import serve
+        from movie_index import close_scan_pool
+        try:
+            serve(csv_path, run_command, warm_up)
+        finally:
+            # The workers of large regex scans live as long as the daemon, and no longer
+            close_scan_pool()
+        return
+
+    if args.command == "db":
+        manage_database(args)
+        return
+
+    # Input the daemon can't see is resolved here before forwarding
+    stdin = None
+    if args.command in ("remove", "restore"):
+        if '-' in args.movie_ids or args.file == '-':
+            stdin = sys.stdin.read()
+        if args.file and args.file != '-':
+            # Checked here, so a bad path is reported the same way with or without the daemon
+            if read_id_file(args.file) is None:
+                return
+            args.file = os.path.abspath(args.file)
+
+    from movie_daemon import forward_command
+    forwarded = forward_command(csv_path, vars(args), stdin)
+    if forwarded is not None:
+        output, errors = forwarded
+        sys.stdout.write(output)
+        sys.stderr.write(errors)
+        return
+
+    run_command(args, stdin)
+
+
+if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        # Large regex scans run on a process pool, which a frozen exe has to support explicitly
+        import multiprocessing
+        multiprocessing.freeze_support()
+    main()
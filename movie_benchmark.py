@@ -0,0 +1,295 @@
+import argparse
+import csv
+import datetime
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Catalog sizes benchmarked by default, roughly today's catalog and 10x / 100x of it
+SIZES = {'25k': 25_000, '250k': 250_000, '2.5m': 2_500_000}
+
+CATALOG_COLUMNS = ['ID', 'Rank', 'Decade_Rank', 'Title', 'Director', 'Runtime', 'Genre', 'Year', 'Decade',
+                   'Country', 'Language', 'Color', 'Silent', 'Rating', 'Votes', 'Cast', 'Writer', 'Producer',
+                   'Cinematographer', 'Editor', 'Composer', 'Production_Company', 'Plot', 'In_Pool', 'Date']
+
+FIRST_NAMES = ['James', 'John', 'Robert', 'Michael', 'William', 'David', 'Richard', 'Charles', 'Joseph', 'Thomas',
+               'Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Barbara', 'Susan', 'Jessica', 'Sarah', 'Karen',
+               'Akira', 'Yasujiro', 'Federico', 'Ingmar', 'Agnes', 'Jean-Luc', 'Francois', 'Wong', 'Satyajit', 'Pedro',
+               'Hans', 'Danny', 'Ennio', 'Bernard', 'Grace', 'Orson', 'Alfred', 'Stanley', 'Steven', 'Zendaya']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hitchcock', 'Kurosawa', 'Ozu', 'Fellini', 'Bergman', 'Varda', 'Godard', 'Truffaut', 'Kar-wai', 'Ray',
+              'Almodovar', 'Zimmer', 'Elfman', 'Morricone', 'Herrmann', 'Kelly', 'Welles', 'Kubrick', 'Spielberg',
+              'Stewart', 'Hanks', 'Cruise', 'Streep', 'Hepburn', 'Bogart', 'Lee', 'Kim', 'Nguyen', 'Muller', 'Rossi']
+GENRES = ['Drama', 'Comedy', 'Thriller', 'Romance', 'Crime', 'Horror', 'Action', 'Adventure', 'Mystery', 'Sci-Fi',
+          'Fantasy', 'Biography', 'History', 'War', 'Family', 'Animation', 'Music', 'Musical', 'Western', 'Sport']
+COUNTRIES = ['United States', 'United Kingdom', 'France', 'Japan', 'Italy', 'Germany', 'India', 'South Korea',
+             'Spain', 'Hong Kong', 'Canada', 'Sweden', 'Mexico', 'Brazil', 'Soviet Union']
+LANGUAGES = ['English', 'French', 'Japanese', 'Italian', 'German', 'Hindi', 'Korean', 'Spanish', 'Cantonese',
+             'Swedish', 'Russian', 'Portuguese', 'Mandarin', 'None']
+COMPANIES = ['Paramount Pictures', 'Metro-Goldwyn-Mayer', 'Warner Bros.', 'Universal Pictures', 'Columbia Pictures',
+             'Twentieth Century Fox', 'Walt Disney Pictures', 'Marvel Studios', 'Toho', 'Gaumont', 'Studio Ghibli',
+             'Shochiku', 'A24', 'Miramax', 'United Artists', 'RKO Radio Pictures', 'Lionsgate', 'Pathe']
+PLOT_WORDS = ('a an the his her their young old man woman family friends detective ghost haunts haunted house '
+              'city war love lovers affair murder mystery small town journey home finds discovers must save world '
+              'secret past killer police officer soldier returns village king queen struggles life death new york '
+              'london paris tokyo after before while during night school student teacher doctor dream revenge '
+              'escape prison robbery heist plan falls in with against becomes unlikely brothers sisters mother '
+              'father daughter son wedding marriage spy agent mission alien planet space ship island ocean').split()
+
+
+def catalog_ids(rows, seed):
+    """The movie IDs of a generated catalog, in row order (unique, like the scraper's random IDs)"""
+    return np.random.default_rng(seed).permutation(rows * 4)[:rows] + 10000
+
+
+def generate_catalog(path, rows, seed=0, chunk=100_000):
+    """
+    Write a synthetic catalog with the real schema: comma-joined credits drawn from a
+    skewed pool of people (so some names are very common), one-sentence plots, '-' for
+    missing values and about 5% of the movies removed from the pool with a date.
+    """
+    rng = np.random.default_rng(seed)
+    randoms = random.Random(seed)
+    ids = catalog_ids(rows, seed)
+
+    # A few thousand distinct people per 25k movies, as in the real catalog
+    people = [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES]
+    while len(people) < max(2000, rows // 8):
+        people.append(f'{randoms.choice(FIRST_NAMES)} {randoms.choice(LAST_NAMES)}-{randoms.choice(LAST_NAMES)} {len(people)}')
+    people = np.array(people, dtype=object)
+
+    def names(count, size, weight=2.0):
+        """size rows of count comma-joined names; low indexes are drawn far more often"""
+        picks = (len(people) * rng.random((size, count)) ** weight).astype(np.int64)
+        return [', '.join(row) for row in people[picks]]
+
+    decade_counts = {}
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CATALOG_COLUMNS)
+
+        for start in range(0, rows, chunk):
+            size = min(chunk, rows - start)
+            years = rng.integers(1915, 2025, size)
+            runtimes = rng.integers(60, 210, size)
+            ratings = np.round(rng.normal(6.6, 0.9, size).clip(1, 10), 1)
+            votes = (10 ** rng.uniform(1, 6.5, size)).astype(np.int64)
+            missing = rng.random((size, 4)) < [0.03, 0.02, 0.02, 0.01]
+            removed = rng.random(size) < 0.05
+
+            casts = names(8, size)
+            directors = names(1, size, weight=1.5)
+            writers = names(2, size)
+            producers = names(2, size)
+            cinematographers = names(1, size)
+            editors = names(1, size)
+            composers = names(1, size, weight=3.0)
+
+            rows_out = []
+            for i in range(size):
+                year = int(years[i])
+                decade = f'{str(year)[:-1]}0s'
+                decade_counts[decade] = decade_counts.get(decade, 0) + 1
+                plot = ' '.join(randoms.choices(PLOT_WORDS, k=randoms.randint(12, 30))).capitalize() + '.'
+                date = ''
+                if removed[i]:
+                    date = str(datetime.datetime(2025, 1, 1) + datetime.timedelta(seconds=randoms.randint(0, 10 ** 7)))
+                rows_out.append([
+                    ids[start + i],
+                    start + i + 1,
+                    decade_counts[decade],
+                    f'{randoms.choice(PLOT_WORDS).title()} {randoms.choice(PLOT_WORDS).title()} {start + i}',
+                    directors[i],
+                    '-' if missing[i, 0] else runtimes[i],
+                    ', '.join(randoms.sample(GENRES, randoms.randint(1, 3))),
+                    year,
+                    decade,
+                    ', '.join(randoms.sample(COUNTRIES, randoms.randint(1, 2))),
+                    randoms.choice(LANGUAGES),
+                    '-' if missing[i, 3] else ('FALSE' if year < 1950 and randoms.random() < 0.8 else 'TRUE'),
+                    'TRUE' if year < 1930 and randoms.random() < 0.7 else 'FALSE',
+                    '-' if missing[i, 1] else ratings[i],
+                    '-' if missing[i, 2] else votes[i],
+                    casts[i],
+                    writers[i],
+                    producers[i],
+                    cinematographers[i],
+                    editors[i],
+                    composers[i],
+                    ', '.join(randoms.sample(COMPANIES, randoms.randint(1, 2))),
+                    plot,
+                    'N' if removed[i] else 'Y',
+                    date,
+                ])
+            writer.writerows(rows_out)
+
+
+def get_scenarios(ids):
+    """
+    The commands timed, as (family, name, arguments).
+    ids are movie IDs of the catalog, used by the pool commands.
+    """
+    removed = [str(movie_id) for movie_id in ids[:100]]
+    return [
+        ('startup', 'help', []),
+        ('startup', 'get', ['get', '-m']),
+        ('numeric', 'rank+year+runtime', ['get', '-r', '100-20000', '-y', '1990s, 2000+', '-rt', '90-150', '-m']),
+        ('numeric', 'rating+votes', ['get', '-rat', '7.5+', '-v', '100000+', '-m']),
+        ('text', 'actor', ['get', '-a', 'James Stewart', '-m']),
+        ('text', 'exact actor', ['get', '-x', '-a', 'James Stewart', '-m']),
+        ('text', 'director+composer', ['get', '-d', 'Hitchcock; Kurosawa', '-com', 'Herrmann', '-m']),
+        ('text', 'negated genre', ['get', '-g', 'Drama, !Comedy', '-m']),
+        ('plot', 'words', ['get', '-pl', 'ghost, house', '-m']),
+        ('plot', 'relevance', ['get', '-pl', 'detective murder', '-rel', '-c', '5', '-m']),
+        ('combined', 'many flags', ['get', '-y', '1950-1999', '-rat', '7+', '-g', 'Drama', '-a', 'Stewart',
+                                    '-pl', 'love', '-col', '1', '-s', '0', '-m']),
+        ('render', 'count all', ['get', '-c', 'all']),
+        ('render', 'count all minimal', ['get', '-c', 'all', '-m']),
+        ('pool', 'remove', ['remove', *removed]),
+        ('pool', 'list', ['list']),
+        ('pool', 'stats', ['stats']),
+        ('pool', 'reset', ['reset']),
+    ]
+
+
+def clear_sidecars(catalog_path):
+    """Delete the caches and pool journal kept next to a catalog"""
+    stem = os.path.splitext(catalog_path)[0]
+    for path in glob.glob(f'{stem}.*.pkl') + glob.glob(f'{stem}.*.npy') + glob.glob(f'{stem}.pool.log'):
+        os.remove(path)
+
+
+def run_command(catalog_path, arguments):
+    """Run movie.py against catalog_path and return the wall-clock seconds it took"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'movie.py')
+    env = dict(os.environ, MOVIE_CSV=catalog_path)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, script, *arguments], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"movie.py {' '.join(arguments)} failed:\n{result.stderr.decode(errors='replace')}")
+    return elapsed
+
+
+def summarize(size, family, name, runs):
+    return {
+        'size': size,
+        'family': family,
+        'scenario': name,
+        'runs': runs,
+        'median': statistics.median(runs),
+        'min': min(runs),
+        'max': max(runs),
+    }
+
+
+def benchmark_size(size, rows, data_dir, repeat, seed):
+    """Time every scenario against a catalog of rows movies, generating it on first use"""
+    catalog_path = os.path.join(data_dir, size, 'movies.csv')
+    if not os.path.exists(catalog_path):
+        os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+        print(f'Generating a {rows:,} movie catalog in {catalog_path}...')
+        generate_catalog(catalog_path, rows, seed)
+
+    results = []
+    # The first get after the catalog changes parses the CSV and builds the catalog caches
+    clear_sidecars(catalog_path)
+    results.append(summarize(size, 'startup', 'cold get', [run_command(catalog_path, ['get', '-m'])]))
+    print(f"{size:>6} {'startup':>9} {'cold get':<22} once   {results[0]['median'] * 1000:9.1f} ms")
+
+    ids = catalog_ids(rows, seed)
+    # Keep to movies still in the pool so every remove really removes something
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        in_pool = {int(row['ID']) for _, row in zip(range(2000), csv.DictReader(f)) if row['In_Pool'] == 'Y'}
+    ids = [movie_id for movie_id in ids[:2000] if movie_id in in_pool]
+
+    timings = {}
+    scenarios = get_scenarios(ids)
+    # The first round only builds the indexes each filter family uses and isn't timed
+    for round in range(repeat + 1):
+        # remove, list and reset run in order, so list sees the removals and reset undoes them
+        for family, name, arguments in scenarios:
+            elapsed = run_command(catalog_path, arguments)
+            if round:
+                timings.setdefault((family, name), []).append(elapsed)
+        # Back to the catalog's own pool state for the next round
+        os.remove(os.path.splitext(catalog_path)[0] + '.pool.log')
+
+    for (family, name), runs in timings.items():
+        results.append(summarize(size, family, name, runs))
+        print(f"{size:>6} {family:>9} {name:<22} median {statistics.median(runs) * 1000:9.1f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a baseline result file; returns True if anything regressed"""
+    previous = {(entry['size'], entry['family'], entry['scenario']): entry for entry in baseline['results']}
+    regressed = False
+    print(f"\n{'size':>6} {'family':>9} {'scenario':<22} {'before':>10} {'after':>10} {'change':>8}")
+    for entry in results:
+        before = previous.get((entry['size'], entry['family'], entry['scenario']))
+        if before is None:
+            continue
+        change = entry['median'] / before['median'] - 1
+        flag = ''
+        if change > tolerance:
+            flag = '  REGRESSION'
+            regressed = True
+        print(f"{entry['size']:>6} {entry['family']:>9} {entry['scenario']:<22} {before['median'] * 1000:8.1f}ms "
+              f"{entry['median'] * 1000:8.1f}ms {change:+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the movie tool against synthetic catalogs.')
+    parser.add_argument('-s', '--sizes', type=str, default=','.join(SIZES), help=f"Catalog sizes to run: {', '.join(SIZES)} or a number of rows (comma separated).")
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='Runs of every scenario per size.')
+    parser.add_argument('-d', '--data', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_data'), help='Directory the generated catalogs are kept in between runs.')
+    parser.add_argument('-o', '--output', type=str, help='Write the results to this JSON file.')
+    parser.add_argument('--compare', type=str, help='JSON results of an earlier run to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Slowdown (as a fraction) reported as a regression by --compare.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated catalogs.')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes.split(','):
+        size = size.strip().lower()
+        if size in SIZES:
+            rows = SIZES[size]
+        elif size.isdigit():
+            rows = int(size)
+        else:
+            print(f"Invalid size: '{size}'\nValid sizes: {', '.join(SIZES)} or a number of rows")
+            return 2
+        results.extend(benchmark_size(size, rows, args.data, args.repeat, args.seed))
+
+    report = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            if compare(results, json.load(f), args.tolerance):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
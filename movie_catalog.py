@@ -0,0 +1,218 @@
+import hashlib
+import pickle
+import os
+
+SNAPSHOT_VERSION = 3
+
+NUMERIC_COLUMNS = ['Rank', 'Decade_Rank', 'Runtime', 'Year', 'Votes']
+CATEGORY_COLUMNS = ['Decade', 'Color', 'Silent', 'In_Pool']
+
+# Comma-joined credit columns, stored as IDs into one interned name table per kind of credit
+CREDIT_TABLES = {
+    'people': ['Director', 'Cast', 'Writer', 'Producer', 'Cinematographer', 'Editor', 'Composer'],
+    'companies': ['Production_Company'],
+}
+CREDIT_COLUMNS = [column for columns in CREDIT_TABLES.values() for column in columns]
+
+
+def get_sidecar_path(csv_path, kind):
+    """Get the path of a cache file kept next to movies.csv (e.g. movies.snapshot.pkl)"""
+    return os.path.splitext(csv_path)[0] + f'.{kind}.pkl'
+
+
+def get_database_path(csv_path):
+    """Get the path of the SQLite catalog kept next to movies.csv, used instead of it once imported"""
+    return os.path.splitext(csv_path)[0] + '.db'
+
+
+def get_source_signature(csv_path):
+    """Cheap signature of the CSV used to detect edits without reading it"""
+    stat = os.stat(csv_path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def hash_file(path):
+    """SHA-1 of a file's contents, used when the cheap signature changed"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def coerce_columns(movies):
+    """Coerce the filterable columns once so the get filters never have to"""
+    import pandas as pd
+
+    for column in NUMERIC_COLUMNS:
+        movies[column] = pd.to_numeric(movies[column], errors='coerce').fillna(-1).astype('int64')
+    movies['Rating'] = pd.to_numeric(movies['Rating'], errors='coerce').fillna(-1.0).astype('float64')
+
+    # Color and Silent are parsed as booleans when the column has no '-' placeholders
+    for column in ['Color', 'Silent']:
+        movies[column] = movies[column].astype(str).str.upper()
+
+    # Catalogs written by movie_scraper.py have no Date column until a movie is removed
+    if 'Date' not in movies:
+        movies['Date'] = None
+
+    for column in CATEGORY_COLUMNS:
+        movies[column] = movies[column].astype('category')
+
+    return movies
+
+
+def intern_credits(movies):
+    """
+    Move the comma-joined credit columns out of the frame into interned name tables.
+    Every distinct name is stored once per table (people or companies) and referred to
+    by its position in it. The credits of row r are names[ids[indptr[r]:indptr[r + 1]]],
+    in billing order (CSR layout); the '-' placeholder becomes an empty list.
+    Returns: (movies without the credit columns, {column: {'names', 'indptr', 'ids'}})
+    """
+    import numpy as np
+    import pandas as pd
+
+    credits = {}
+    for columns in CREDIT_TABLES.values():
+        exploded = []
+        for column in columns:
+            names = movies[column].reset_index(drop=True).str.split(', ').explode()
+            exploded.append(names[names.notna() & (names != '-')])
+
+        codes, names = pd.factorize(np.concatenate([values.to_numpy(dtype=object) for values in exploded]))
+        names = names.tolist()
+        offset = 0
+        for column, values in zip(columns, exploded):
+            counts = np.bincount(values.index.to_numpy(dtype=np.int64), minlength=len(movies))
+            credits[column] = {
+                'names': names,
+                'indptr': np.concatenate([[0], np.cumsum(counts)]),
+                'ids': codes[offset:offset + len(values)].astype(np.int32),
+            }
+            offset += len(values)
+
+    return movies.drop(columns=CREDIT_COLUMNS), credits
+
+
+def join_credits(role, positions):
+    """Rebuild the comma-joined text of one credit column (as in movies.csv) for the rows at positions"""
+    import numpy as np
+
+    names, indptr, ids = role['names'], role['indptr'], role['ids']
+    starts = indptr[positions]
+    lengths = indptr[positions + 1] - starts
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+
+    # Gather every row's name IDs into one flat list, then join them row by row
+    gather = np.arange(bounds[-1]) + np.repeat(starts - bounds[:-1], lengths)
+    flat = [names[name_id] for name_id in ids[gather].tolist()]
+    bounds = bounds.tolist()
+    return [', '.join(flat[start:end]) or '-' for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def read_sidecar(path):
+    """Load a cache file, returning None if it is missing or unreadable"""
+    try:
+        with open(path, 'rb') as f:
+            sidecar = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(sidecar, dict) or sidecar.get('version') != SNAPSHOT_VERSION:
+        return None
+    return sidecar
+
+
+def write_sidecar(path, sidecar):
+    """Atomically replace a cache file; a read-only install just skips caching"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(sidecar, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def build_light_catalog(movies, signature, digest):
+    """
+    Build the minimal catalog used by the commands that don't filter (list, remove, reset...).
+    It only holds plain Python lists, so reading it needs neither pandas nor numpy.
+    """
+    removed = (movies['In_Pool'] == 'N').to_numpy()
+    return {
+        'version': SNAPSHOT_VERSION,
+        'signature': signature,
+        'sha1': digest,
+        'ID': movies['ID'].tolist(),
+        'Title': movies['Title'].tolist(),
+        'Year': [str(year) if year >= 0 else '-' for year in movies['Year'].tolist()],
+        'removed': dict(zip(movies.loc[removed, 'ID'].tolist(), movies.loc[removed, 'Date'].tolist() if 'Date' in movies else [None] * removed.sum())),
+    }
+
+
+def load_catalog(csv_path):
+    """
+    Load the movie catalog with typed columns and interned credits (see intern_credits).
+    Both are cached in a binary snapshot next to the CSV and rebuilt whenever the
+    CSV's size/mtime changes and its content hash no longer matches.
+    Returns: (movies, credits, catalog_version) - the version is the CSV's content hash
+    """
+    snapshot_path = get_sidecar_path(csv_path, 'snapshot')
+    signature = get_source_signature(csv_path)
+    snapshot = read_sidecar(snapshot_path)
+
+    if snapshot is not None and snapshot['signature'] == signature:
+        return snapshot['movies'], snapshot['credits'], snapshot['sha1']
+
+    # The file was touched or copied but not edited, so only the signature is stale
+    digest = hash_file(csv_path)
+    if snapshot is not None and snapshot['sha1'] == digest:
+        movies, credits = snapshot['movies'], snapshot['credits']
+        snapshot['signature'] = signature
+    else:
+        import pandas as pd
+        movies, credits = intern_credits(coerce_columns(pd.read_csv(csv_path)))
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'signature': signature,
+            'sha1': digest,
+            'movies': movies,
+            'credits': credits,
+        }
+
+    write_sidecar(snapshot_path, snapshot)
+    write_sidecar(get_sidecar_path(csv_path, 'light'), build_light_catalog(movies, signature, digest))
+    return movies, credits, digest
+
+
+def load_light_catalog(csv_path):
+    """
+    Load the minimal catalog (ID, Title, Year and the CSV's own removals) without importing pandas.
+    Falls back to load_catalog, which refreshes both caches, when the CSV has changed.
+    """
+    signature = get_source_signature(csv_path)
+    light = read_sidecar(get_sidecar_path(csv_path, 'light'))
+    if light is not None and light['signature'] == signature:
+        return light
+
+    movies, _, digest = load_catalog(csv_path)
+    return build_light_catalog(movies, signature, digest)
+
+
+def load_sidecar(csv_path, kind, catalog_version, build):
+    """
+    Load a structure derived from the catalog (an index, statistics, ...),
+    calling build() to recreate it when it was made from another catalog version.
+    """
+    path = get_sidecar_path(csv_path, kind)
+    sidecar = read_sidecar(path)
+    if sidecar is not None and sidecar['sha1'] == catalog_version:
+        return sidecar['data']
+
+    data = build()
+    write_sidecar(path, {'version': SNAPSHOT_VERSION, 'sha1': catalog_version, 'data': data})
+    return data
@@ -0,0 +1,171 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+
+# How long a client waits for a daemon to accept before running the command itself
+CONNECT_TIMEOUT = 0.5
+
+
+def get_address_path(csv_path):
+    """Get the path of the file a running daemon advertises its address in"""
+    return os.path.splitext(csv_path)[0] + '.daemon.json'
+
+
+def get_socket_path(csv_path):
+    """Get the path of the daemon's Unix socket"""
+    return os.path.splitext(csv_path)[0] + '.sock'
+
+
+def read_address(csv_path):
+    """Read the advertised daemon address, or None when no daemon is running"""
+    try:
+        with open(get_address_path(csv_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def connect(address):
+    """Open a connection to the daemon at address"""
+    if address['family'] == 'unix':
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address['path']
+    else:
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = ('127.0.0.1', address['port'])
+
+    client.settimeout(CONNECT_TIMEOUT)
+    try:
+        client.connect(target)
+    except OSError:
+        client.close()
+        raise
+    client.settimeout(None)
+    return client
+
+
+def receive_all(connection):
+    """Read from a connection until the other side stops sending"""
+    chunks = []
+    while chunk := connection.recv(1 << 16):
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def forward_command(csv_path, arguments, stdin=None):
+    """
+    Run a parsed command on the daemon, if one is running.
+    arguments is vars() of the parsed arguments and stdin the text piped to the client.
+    Returns: (output, errors) - what the command wrote to stdout and stderr,
+    or None if the command has to run in this process
+    """
+    address = read_address(csv_path)
+    if address is None:
+        return None
+
+    try:
+        client = connect(address)
+    except OSError:
+        return None
+
+    request = {'token': address['token'], 'arguments': arguments, 'stdin': stdin}
+    try:
+        with client:
+            client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            client.shutdown(socket.SHUT_WR)
+            response = json.loads(receive_all(client).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+    return response.get('output', ''), response.get('errors', '')
+
+
+def serve(csv_path, run_command, warm_up):
+    """
+    Keep the catalog loaded and run commands forwarded by movie clients until interrupted.
+    Listens on a Unix socket next to movies.csv, or on a loopback TCP port where Unix
+    sockets are unavailable (e.g. Windows). Commands run one at a time against the one
+    loaded copy of the catalog, since their output is captured by redirecting stdout and stderr.
+    """
+    # Only the daemon needs these; clients keep their imports minimal
+    import secrets
+    import signal
+    import socketserver
+    import threading
+    import traceback
+
+    lock = threading.Lock()
+    token = secrets.token_hex(16)
+
+    class CommandHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline().decode('utf-8'))
+            except ValueError:
+                return
+            if not secrets.compare_digest(str(request.get('token')), token):
+                return
+
+            arguments = argparse.Namespace(**request['arguments'])
+            output, errors = io.StringIO(), io.StringIO()
+            with lock, contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+                try:
+                    run_command(arguments, request.get('stdin'))
+                except SystemExit:
+                    pass
+                except Exception:
+                    traceback.print_exc(file=errors)
+
+            self.wfile.write(json.dumps({'output': output.getvalue(), 'errors': errors.getvalue()}).encode('utf-8'))
+
+    server = None
+    socket_path = get_socket_path(csv_path)
+    if hasattr(socket, 'AF_UNIX'):
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(socket_path)
+        try:
+            server = Server(socket_path, CommandHandler)
+            os.chmod(socket_path, 0o600)
+            address = {'family': 'unix', 'path': socket_path}
+        except OSError:
+            server = None
+
+    if server is None:
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        server = Server(('127.0.0.1', 0), CommandHandler)
+        address = {'family': 'tcp', 'port': server.server_address[1]}
+
+    warm_up()
+
+    address['token'] = token
+    address['pid'] = os.getpid()
+    address_path = get_address_path(csv_path)
+    fd = os.open(address_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(address, f)
+
+    # Stopping the daemon with a plain kill should still remove the address file
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"Serving movie commands for {csv_path} (press Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(address_path)
+        if address['family'] == 'unix':
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(socket_path)
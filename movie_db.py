@@ -0,0 +1,483 @@
+import json
+import numpy as np
+import os
+import re
+import sqlite3
+import time
+from movie_filters import describe
+from movie_index import FUZZY_THRESHOLD, REGEX_CHARACTERS, TEXT_INDEX_COLUMNS, WORD, normalize, trigrams
+from movie_render import EXPORT_COLUMNS, NUMERIC_EXPORT_COLUMNS, RENDER_CHUNK
+from movie_stats import EXPLODED_COLUMNS, RANK_BAND_LABELS, RANK_BANDS, STAT_DIMENSIONS
+
+# Typed columns; the others are stored as given. Missing numbers are stored as -1, as in the frame.
+INTEGER_COLUMNS = ['ID', 'Rank', 'Decade_Rank', 'Runtime', 'Year', 'Votes']
+REAL_COLUMNS = ['Rating']
+# Columns with a B-tree index for range and equality filters
+INDEXED_COLUMNS = ['Rank', 'Decade_Rank', 'Runtime', 'Year', 'Rating', 'Votes', 'Decade', 'Color', 'Silent']
+# Pool state lives in the removed table rather than in these columns
+POOL_COLUMNS = ['In_Pool', 'Date']
+
+# The trigram index only finds substrings of at least this many characters
+TRIGRAM_LENGTH = 3
+# Names sharing the most trigrams with a term that are scored when looking for similar names
+FUZZY_CANDIDATES = 1000
+
+SCHEMA = [
+    'CREATE TABLE removed ("ID" INTEGER PRIMARY KEY, "Date" TEXT)',
+    'CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)',
+    # Every distinct name (people, companies, genres, countries and languages) once,
+    # and which movies credit it in which column
+    'CREATE TABLE names (id INTEGER PRIMARY KEY, name TEXT NOT NULL)',
+    'CREATE INDEX names_nocase ON names (name COLLATE NOCASE)',
+    'CREATE TABLE credits (name INTEGER NOT NULL, role TEXT NOT NULL, movie INTEGER NOT NULL, PRIMARY KEY (name, role, movie)) WITHOUT ROWID',
+]
+
+# Sessions of "movie get --session", kept with the catalog so a re-import drops them;
+# created on first use in databases imported without it
+SESSION_SCHEMA = ('CREATE TABLE IF NOT EXISTS sessions (name TEXT PRIMARY KEY, key TEXT NOT NULL, seed INTEGER NOT NULL, '
+                  '"round" INTEGER NOT NULL, cursor INTEGER NOT NULL, movies BLOB NOT NULL, weights BLOB)')
+
+# The groups counted by "movie stats" (see movie_stats) and the movies in each; triggers on removed
+# keep the removed counts current, a few rows per removed or restored movie
+STATS_SCHEMA = [
+    'CREATE TABLE stats (id INTEGER PRIMARY KEY, dimension TEXT NOT NULL, value TEXT NOT NULL, total INTEGER NOT NULL, '
+    'removed INTEGER NOT NULL, UNIQUE (dimension, value))',
+    'CREATE TABLE stat_movies (movie INTEGER NOT NULL, stat INTEGER NOT NULL, PRIMARY KEY (movie, stat)) WITHOUT ROWID',
+    'CREATE TRIGGER stats_remove AFTER INSERT ON removed BEGIN UPDATE stats SET removed = removed + 1 WHERE id IN '
+    '(SELECT stat FROM stat_movies WHERE movie = (SELECT rowid FROM movies WHERE "ID" = NEW."ID")); END',
+    'CREATE TRIGGER stats_restore AFTER DELETE ON removed BEGIN UPDATE stats SET removed = removed - 1 WHERE id IN '
+    '(SELECT stat FROM stat_movies WHERE movie = (SELECT rowid FROM movies WHERE "ID" = OLD."ID")); END',
+]
+
+FULL_TEXT_SCHEMA = [
+    "CREATE VIRTUAL TABLE names_fts USING fts5(name, content='names', content_rowid='id', tokenize='trigram')",
+    "INSERT INTO names_fts (names_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE text_fts USING fts5(Title, Plot, content='movies', tokenize='porter unicode61 remove_diacritics 2')",
+    "INSERT INTO text_fts (text_fts) VALUES ('rebuild')",
+]
+
+
+def quote(column):
+    """Quote a column name for SQL"""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def quote_phrase(text):
+    """Quote text as a single FTS5 phrase"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def regexp(pattern, text):
+    """The REGEXP operator, matching like str.contains(pattern, case=False, na=False)"""
+    return isinstance(text, str) and re.search(pattern, text, flags=re.IGNORECASE) is not None
+
+
+def connect(database_path):
+    """Open the SQLite catalog"""
+    connection = sqlite3.connect(database_path, check_same_thread=False)
+    connection.create_function('regexp', 2, regexp, deterministic=True)
+    return connection
+
+
+def plain_values(values):
+    """A column as plain Python values for sqlite3, None where the value is missing"""
+    return [None if value != value else value for value in values.tolist()]  # NaN != NaN
+
+
+def import_catalog(csv_path, database_path):
+    """
+    Build the SQLite catalog from movies.csv and the current pool state.
+    The database is written next to the final path and moved into place once complete.
+    Returns: (movies imported, movies removed from the pool)
+    """
+    import pandas as pd
+    from movie_catalog import coerce_columns, load_light_catalog
+    from movie_pool import load_pool_state
+
+    movies = coerce_columns(pd.read_csv(csv_path))
+    removed = load_pool_state(csv_path, load_light_catalog(csv_path))
+    columns = [column for column in movies.columns if column not in POOL_COLUMNS]
+
+    tmp_path = f"{database_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        def definition(column):
+            if column == 'ID':
+                return f'{quote(column)} INTEGER NOT NULL UNIQUE'
+            if column in INTEGER_COLUMNS:
+                return f'{quote(column)} INTEGER'
+            if column in REAL_COLUMNS:
+                return f'{quote(column)} REAL'
+            return quote(column)
+
+        # The rowid is the movie's position in movies.csv, so "-c all" keeps the catalog order
+        connection.execute(f"CREATE TABLE movies ({', '.join(definition(column) for column in columns)})")
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+        rows = zip(range(1, len(movies) + 1), *(plain_values(movies[column]) for column in columns))
+        marks = ', '.join('?' * (len(columns) + 1))
+        connection.executemany(f"INSERT INTO movies (rowid, {', '.join(map(quote, columns))}) VALUES ({marks})", rows)
+
+        names, roles, positions = [], [], []
+        for column in TEXT_INDEX_COLUMNS:
+            credited = movies[column].reset_index(drop=True).str.split(', ').explode()
+            credited = credited[credited.notna() & (credited != '-')]
+            names.append(credited.to_numpy(dtype=object))
+            positions.append(credited.index.to_numpy(dtype=np.int64) + 1)
+            roles.append(np.full(len(credited), TEXT_INDEX_COLUMNS.index(column)))
+
+        # (name, role, movie) packed into one integer, so duplicates drop out of a flat sort in key order
+        codes, uniques = pd.factorize(np.concatenate(names))
+        keys = np.unique((codes.astype(np.int64) * len(TEXT_INDEX_COLUMNS) + np.concatenate(roles)) * (len(movies) + 1) + np.concatenate(positions))
+        name_ids, movie_ids = np.divmod(keys, len(movies) + 1)
+        name_ids, role_ids = np.divmod(name_ids, len(TEXT_INDEX_COLUMNS))
+        connection.executemany('INSERT INTO names VALUES (?, ?)', zip(range(1, len(uniques) + 1), uniques.tolist()))
+        connection.executemany('INSERT INTO credits VALUES (?, ?, ?)',
+                               zip((name_ids + 1).tolist(), map(TEXT_INDEX_COLUMNS.__getitem__, role_ids.tolist()), movie_ids.tolist()))
+
+        connection.executemany('INSERT INTO removed VALUES (?, ?)', ((movie_id, str(date)) for movie_id, date in removed.items()))
+        connection.executemany('INSERT INTO meta VALUES (?, ?)', [('columns', json.dumps(list(movies.columns))), ('rows', str(len(movies)))])
+
+        for column in INDEXED_COLUMNS:
+            if column in columns:
+                connection.execute(f'CREATE INDEX {quote("movies_" + column)} ON movies ({quote(column)})')
+        for statement in FULL_TEXT_SCHEMA:
+            connection.execute(statement)
+        build_stats(connection)
+
+        connection.commit()
+        connection.execute('ANALYZE')
+        connection.close()
+        os.replace(tmp_path, database_path)
+    except BaseException:
+        connection.close()
+        os.remove(tmp_path)
+        raise
+
+    return len(movies), len(removed)
+
+
+def export_catalog(connection, path):
+    """
+    Write the SQLite catalog back as a movies.csv, with In_Pool and Date holding the pool state.
+    Returns: the number of movies written
+    """
+    import pandas as pd
+
+    columns = json.loads(read_meta(connection, 'columns'))
+    stored = [column for column in columns if column not in POOL_COLUMNS]
+    selected = ', '.join(f'm.{quote(column)}' for column in stored)
+    rows = connection.execute(f'SELECT {selected}, r."Date" FROM movies m LEFT JOIN removed r ON r."ID" = m."ID" ORDER BY m.rowid').fetchall()
+
+    movies = pd.DataFrame(rows, columns=stored + ['Date'])
+    for column in INTEGER_COLUMNS + REAL_COLUMNS:
+        if column != 'ID' and column in movies:
+            movies[column] = movies[column].astype(object).where(movies[column] >= 0, '-')
+    movies['In_Pool'] = np.where(movies['Date'].isna(), 'Y', 'N')
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    movies[columns].to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return len(movies)
+
+
+def stat_values_query(dimension):
+    """SQL for the (movie rowid, value) pairs of a stats dimension, as movie_stats.get_stat_values finds them"""
+    if dimension == 'Rank':
+        bands = ' '.join(f"WHEN \"Rank\" <= {high} THEN '{label}'" for high, label in zip(RANK_BANDS, RANK_BAND_LABELS))
+        return (f"SELECT rowid AS movie, CASE WHEN \"Rank\" <= 0 THEN '{RANK_BAND_LABELS[-1]}' {bands} "
+                f"ELSE '{RANK_BAND_LABELS[-2]}' END AS value FROM movies")
+    if dimension in EXPLODED_COLUMNS:
+        return f"SELECT c.movie, n.name AS value FROM credits c JOIN names n ON n.id = c.name WHERE c.role = '{dimension}'"
+    return f"SELECT rowid AS movie, {quote(dimension)} AS value FROM movies WHERE {quote(dimension)} IS NOT NULL AND {quote(dimension)} != '-'"
+
+
+def build_stats(connection):
+    """Create and fill the stats tables (on import, or on first use in a database imported without them)"""
+    with connection:
+        for statement in STATS_SCHEMA:
+            connection.execute(statement)
+        for dimension in STAT_DIMENSIONS:
+            values = stat_values_query(dimension)
+            connection.execute(f'INSERT INTO stats (dimension, value, total, removed) SELECT ?, v.value, count(*), '
+                               f'sum(m."ID" IN (SELECT "ID" FROM removed)) FROM ({values}) v JOIN movies m ON m.rowid = v.movie '
+                               f'GROUP BY v.value', (dimension,))
+            connection.execute(f'INSERT OR IGNORE INTO stat_movies SELECT v.movie, s.id FROM ({values}) v '
+                               f'JOIN stats s ON s.dimension = ? AND s.value = v.value', (dimension,))
+
+
+def count_stats(connection, tree=None):
+    """
+    Count the movies in and out of the pool for every stats group, among the movies matching tree (all movies when None).
+    Returns: (rows, movies, removed) - (dimension, value, remaining, removed) per group and the totals
+    """
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'stats'").fetchone() is None:
+        build_stats(connection)
+
+    if tree is None:
+        rows = connection.execute('SELECT dimension, value, total - removed, removed FROM stats').fetchall()
+        movies = int(read_meta(connection, 'rows'))
+        removed = connection.execute('SELECT count(*) FROM removed WHERE "ID" IN (SELECT "ID" FROM movies)').fetchone()[0]
+        return rows, movies, removed
+
+    condition, parameters = to_sql(tree)
+    matched = f'SELECT rowid AS movie, "ID" IN (SELECT "ID" FROM removed) AS gone FROM movies WHERE {condition}'
+    rows = connection.execute(f'SELECT s.dimension, s.value, count(*) - sum(m.gone), sum(m.gone) FROM ({matched}) m '
+                              f'JOIN stat_movies sm ON sm.movie = m.movie JOIN stats s ON s.id = sm.stat GROUP BY s.id', parameters).fetchall()
+    movies, removed = connection.execute(f'SELECT count(*), coalesce(sum(gone), 0) FROM ({matched})', parameters).fetchone()
+    return rows, movies, removed
+
+
+def read_meta(connection, key):
+    """Read a value stored with the catalog at import"""
+    row = connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return None if row is None else row[0]
+
+
+def to_sql(tree):
+    """
+    Translate a filter tree (see movie_filters) into a parameterized SQL condition over movies.
+    Numbers and categories use the B-tree indexes, names the trigram index of the names table,
+    plot words the porter-stemmed full-text index and regular expressions the REGEXP operator.
+    Returns: (condition, parameters)
+    """
+    kind = tree[0]
+
+    if kind in ('and', 'or'):
+        if not tree[1]:
+            return ('1' if kind == 'and' else '0'), []
+        parts = [to_sql(child) for child in tree[1]]
+        return '(' + f' {kind.upper()} '.join(condition for condition, _ in parts) + ')', [value for _, values in parts for value in values]
+
+    if kind == 'not':
+        condition, parameters = to_sql(tree[1])
+        return f'NOT {condition}', parameters
+
+    if kind == 'range':
+        _, column, low, high = tree
+        parts, parameters = [], []
+        if low is not None:
+            parts.append(f'{quote(column)} >= ?')
+            parameters.append(low)
+        if high is not None:
+            parts.append(f'{quote(column)} <= ?')
+            parameters.append(high)
+        return '(' + (' AND '.join(parts) or '1') + ')', parameters
+
+    if kind == 'equals':
+        _, column, value = tree
+        return f'{quote(column)} = ?', [value]
+
+    if kind == 'contains':
+        _, column, term = tree
+        if REGEX_CHARACTERS.search(term):
+            re.compile(term)  # Report an invalid pattern as the frame-backed filters would
+            return f'{quote(column)} REGEXP ?', [term]
+        if column not in TEXT_INDEX_COLUMNS:
+            return f'instr(lower({quote(column)}), ?) > 0', [term.lower()]
+        if len(term) >= TRIGRAM_LENGTH:
+            names = 'SELECT rowid FROM names_fts WHERE names_fts MATCH ?'
+            term = quote_phrase(term)
+        else:
+            names = 'SELECT id FROM names WHERE instr(lower(name), ?) > 0'
+            term = term.lower()
+        return f'rowid IN (SELECT movie FROM credits WHERE role = ? AND name IN ({names}))', [column, term]
+
+    if kind == 'name':
+        _, column, term = tree
+        return ('rowid IN (SELECT movie FROM credits WHERE role = ? AND name IN '
+                '(SELECT id FROM names WHERE name = ? COLLATE NOCASE))'), [column, term]
+
+    if kind == 'words':
+        _, column, term = tree
+        words = WORD.findall(term.lower())
+        if not words:
+            return '1', []
+        query = f"{column} : ({' AND '.join(map(quote_phrase, words))})"
+        return 'rowid IN (SELECT rowid FROM text_fts WHERE text_fts MATCH ?)', [query]
+
+    raise ValueError(f"Unknown filter node: {kind}")
+
+
+def select_matches(connection, tree, columns=()):
+    """
+    Find the movies matching a filter tree, along with whether they are in the pool and the given numeric columns.
+    Returns: (matches, pooled, values) - the rowids of the matching movies in catalog order,
+    a mask of those still in the pool and {column: values aligned with matches}
+    """
+    condition, parameters = to_sql(tree)
+    selected = ''.join(f', {quote(column)}' for column in columns)
+    rows = connection.execute(f'SELECT rowid, "ID" NOT IN (SELECT "ID" FROM removed){selected} '
+                              f'FROM movies WHERE {condition} ORDER BY rowid', parameters).fetchall()
+
+    matches = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    pooled = np.fromiter((row[1] for row in rows), dtype=bool, count=len(rows))
+    values = {column: np.fromiter((row[2 + i] for row in rows), dtype=np.float64, count=len(rows))
+              for i, column in enumerate(columns)}
+    return matches, pooled, values
+
+
+def explain_matches(connection, tree):
+    """
+    Report how a filter tree runs on the database, for get --explain.
+    SQLite runs the filters as one query, so every child of the top-level 'and' is measured by counting
+    the movies matching it and the children before it; the query plan shows the indexes SQLite picked.
+    Returns: (trace, plan) - entries as evaluate's trace and the lines of EXPLAIN QUERY PLAN
+    """
+    children = tree[1] if tree[0] == 'and' else [tree]
+    trace = []
+    rows = int(connection.execute('SELECT count(*) FROM movies').fetchone()[0])
+    for position, child in enumerate(children):
+        condition, parameters = to_sql(('and', children[:position + 1]))
+        started = time.perf_counter()
+        rows_out = int(connection.execute(f'SELECT count(*) FROM movies WHERE {condition}', parameters).fetchone()[0])
+        trace.append({'filter': describe(child), 'rows_in': rows, 'rows_out': rows_out, 'seconds': time.perf_counter() - started})
+        rows = rows_out
+        if not rows:
+            trace.extend({'filter': describe(rest), 'skipped': True} for rest in children[position + 1:])
+            break
+
+    # Plan rows are (id, parent, unused, detail); nested steps are indented under their parent
+    condition, parameters = to_sql(tree)
+    depths, plan = {0: -1}, []
+    for step, parent, _, detail in connection.execute(f'EXPLAIN QUERY PLAN SELECT rowid FROM movies WHERE {condition} ORDER BY rowid', parameters):
+        depths[step] = depths.get(parent, -1) + 1
+        plan.append('  ' * depths[step] + detail)
+    return trace, plan
+
+
+def in_pool(connection, rowids):
+    """Mask of the given rowids whose movies are still in the pool"""
+    chunk = rowids.tolist()
+    pooled = {rowid for (rowid,) in connection.execute(
+        f'SELECT rowid FROM movies WHERE rowid IN ({", ".join("?" * len(chunk))}) AND "ID" NOT IN (SELECT "ID" FROM removed)', chunk)}
+    return np.fromiter((rowid in pooled for rowid in chunk), dtype=bool, count=len(chunk))
+
+
+def load_session(connection, name):
+    """Load a session of "movie get --session" (see movie_sessions), None when there is none by that name"""
+    connection.execute(SESSION_SCHEMA)
+    row = connection.execute('SELECT key, seed, "round", cursor, movies, weights FROM sessions WHERE name = ?', (name,)).fetchone()
+    if row is None:
+        return None
+    key, seed, round_number, cursor, movies, weights = row
+    return {'key': key, 'seed': seed, 'round': round_number, 'cursor': cursor, 'movies': np.frombuffer(movies, dtype=np.int64),
+            'weights': None if weights is None else np.frombuffer(weights, dtype=np.float64)}
+
+
+def save_session(connection, name, session, cursor_only=False):
+    """Store a session; with cursor_only, only its cursor moved and the rest of the row is left as is"""
+    with connection:
+        if cursor_only:
+            connection.execute('UPDATE sessions SET cursor = ? WHERE name = ?', (session['cursor'], name))
+            return
+        weights = session['weights']
+        connection.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (name, session['key'], session['seed'], session['round'], session['cursor'],
+                            session['movies'].astype(np.int64).tobytes(), None if weights is None else weights.astype(np.float64).tobytes()))
+
+
+def matches_any(connection, tree):
+    """Tell whether any movie (removed or not) matches a filter tree"""
+    condition, parameters = to_sql(tree)
+    return bool(connection.execute(f'SELECT EXISTS (SELECT 1 FROM movies WHERE {condition})', parameters).fetchone()[0])
+
+
+def similar_names(connection, column, term, limit):
+    """
+    Return the names of column most similar to term, best first, scored as movie_index.lookup_similar does.
+    Candidates are the names sharing the most trigrams with term in the trigram full-text index.
+    """
+    grams = {word[i:i + TRIGRAM_LENGTH] for word in WORD.findall(normalize(term)) for i in range(len(word) - TRIGRAM_LENGTH + 1)}
+    if not grams:
+        return []
+
+    rows = connection.execute(
+        'SELECT n.name FROM names_fts JOIN names n ON n.id = names_fts.rowid WHERE names_fts MATCH ? '
+        'AND EXISTS (SELECT 1 FROM credits c WHERE c.name = n.id AND c.role = ?) ORDER BY rank LIMIT ?',
+        [' OR '.join(map(quote_phrase, sorted(grams))), column, FUZZY_CANDIDATES])
+
+    query = trigrams(term)
+    scored = []
+    for (name,) in rows:
+        name_grams = trigrams(name)
+        score = len(query & name_grams) / len(query)
+        if score >= FUZZY_THRESHOLD:
+            scored.append((-score, len(name_grams), name))
+    return [name for _, _, name in sorted(scored)[:limit]]
+
+
+def score_plots(connection, query, pool):
+    """Score the plots of the movies in pool against the words of query with BM25 (0 where nothing matches)"""
+    words = WORD.findall(query.lower())
+    if not words:
+        return np.zeros(len(pool))
+
+    # bm25() is lower for better matches; Title gets no weight
+    rows = connection.execute("SELECT rowid, -bm25(text_fts, 0.0, 1.0) FROM text_fts WHERE text_fts MATCH ?",
+                              [f"Plot : ({' OR '.join(map(quote_phrase, words))})"])
+    scores = dict(rows.fetchall())
+    return np.fromiter((scores.get(rowid, 0.0) for rowid in pool.tolist()), dtype=np.float64, count=len(pool))
+
+
+def fetch_movies(connection, rowids):
+    """Yield the movies with the given rowids, in that order, as chunks of {column: values} for rendering"""
+    selected = ', '.join(map(quote, EXPORT_COLUMNS))
+    for start in range(0, len(rowids), RENDER_CHUNK):
+        chunk = rowids[start:start + RENDER_CHUNK].tolist()
+        rows = {row[0]: row[1:] for row in connection.execute(
+            f"SELECT rowid, {selected} FROM movies WHERE rowid IN ({', '.join('?' * len(chunk))})", chunk)}
+        ordered = [rows[rowid] for rowid in chunk]
+        yield {column: np.array([row[i] for row in ordered], dtype=None if column in NUMERIC_EXPORT_COLUMNS else object)
+               for i, column in enumerate(EXPORT_COLUMNS)}
+
+
+def change_pool(connection, action, ids, date):
+    """
+    Remove ('remove') or restore ('restore') movies in a single transaction.
+    The pool is read inside the write transaction, so a concurrent change can't make the stats triggers count twice.
+    Returns: (changed, unchanged, missing) - the IDs changed, those already in the requested state and unknown ones
+    """
+    known, removed = set(), set()
+    unique = list(dict.fromkeys(ids))
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        for start in range(0, len(unique), RENDER_CHUNK):
+            batch = unique[start:start + RENDER_CHUNK]
+            marks = ', '.join('?' * len(batch))
+            known.update(movie_id for (movie_id,) in connection.execute(f'SELECT "ID" FROM movies WHERE "ID" IN ({marks})', batch))
+            removed.update(movie_id for (movie_id,) in connection.execute(f'SELECT "ID" FROM removed WHERE "ID" IN ({marks})', batch))
+
+        changed, unchanged, missing = [], [], []
+        for movie_id in ids:
+            if movie_id not in known:
+                missing.append(movie_id)
+            elif (action == 'remove') == (movie_id in removed):
+                unchanged.append(movie_id)
+            else:
+                changed.append(movie_id)
+                if action == 'remove':
+                    removed.add(movie_id)
+                else:
+                    removed.discard(movie_id)
+
+        if action == 'remove':
+            connection.executemany('INSERT INTO removed VALUES (?, ?)', ((movie_id, date) for movie_id in changed))
+        else:
+            connection.executemany('DELETE FROM removed WHERE "ID" = ?', ((movie_id,) for movie_id in changed))
+    return changed, unchanged, missing
+
+
+def reset_pool(connection):
+    """Return every movie to the pool"""
+    with connection:
+        connection.execute('DELETE FROM removed')
+
+
+def list_removed(connection):
+    """Get the removed movies as (title, year, date), in the order they were removed"""
+    rows = connection.execute('SELECT m."Title", m."Year", r."Date" FROM removed r JOIN movies m ON m."ID" = r."ID" ORDER BY r."Date"')
+    return [(title, str(year) if year is not None and year >= 0 else '-', date) for title, year, date in rows]
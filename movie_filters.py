@@ -0,0 +1,493 @@
+import numpy as np
+import re
+import time
+from movie_catalog import join_credits
+from movie_index import (FUZZY_MATCHES, REGEX_CHARACTERS, TEXT_INDEX_COLUMNS, get_postings, lookup_name, lookup_range,
+                         lookup_term, match_words, scan_term, tokenize)
+
+# Filter trees are nested tuples:
+#   ('and', [children]), ('or', [children]), ('not', child)
+#   ('range', column, low, high)  - inclusive bounds, None when open-ended
+#   ('equals', column, value)
+#   ('contains', column, term)    - case-insensitive substring (or regex) match
+#   ('name', column, term)        - one of the comma-joined names equals term (case-insensitive)
+#   ('words', column, term)       - every word of term occurs in the column (whole, stemmed words)
+#   ('fuzzy', leaf)               - a contains/name leaf, or any name similar to its term
+#                                   (replaced by expand_fuzzy before the tree is evaluated)
+
+# Flags that take a comma/semicolon/! text filter, in the order the get command applies them
+TEXT_FILTERS = [
+    ('director', 'Director'),
+    ('genre', 'Genre'),
+    ('country', 'Country'),
+    ('language', 'Language'),
+    ('actor', 'Cast'),
+    ('writer', 'Writer'),
+    ('producer', 'Producer'),
+    ('cinematographer', 'Cinematographer'),
+    ('editor', 'Editor'),
+    ('composer', 'Composer'),
+    ('production_company', 'Production_Company'),
+    ('plot', 'Plot'),
+]
+
+# Free-text columns searched by words through the ranked index rather than by substring
+WORD_COLUMNS = ['Plot']
+
+# Rough cost of evaluating a filter node, relative to a binary search in a sorted index.
+# Row scans (regular expressions) cost the most and only run on the rows still left.
+NODE_COSTS = {'range': 1, 'equals': 1, 'name': 1, 'words': 2, 'contains': 5, 'scan': 200}
+# Share of rows assumed to match a regular expression, which no statistic can estimate
+SCAN_SELECTIVITY = 0.1
+
+
+def parse_text_filter(command, column, exact=False, fuzzy=False):
+    """
+    Compile a text filter into a filter tree.
+    Supports: comma for AND, semicolon for OR, ! for negation
+    Example: "Nolan, Zimmer; Spielberg" = (Nolan AND Zimmer) OR Spielberg
+    With exact, terms must equal whole names of the column rather than parts of them.
+    With fuzzy, names similar to a term (misspelled or without its accents) match it too.
+    """
+    groups = []
+    for group in command.split(';'):
+        terms = []
+        for term in group.split(','):
+            term = term.strip()
+            negated = term.startswith('!')
+            if negated:
+                term = term[1:]
+
+            if exact and column in TEXT_INDEX_COLUMNS:
+                node = ('name', column, term)
+            elif column in WORD_COLUMNS and not REGEX_CHARACTERS.search(term):
+                node = ('words', column, term)
+            else:
+                node = ('contains', column, term)
+            if fuzzy and column in TEXT_INDEX_COLUMNS and not REGEX_CHARACTERS.search(term):
+                node = ('fuzzy', node)
+            terms.append(('not', node) if negated else node)
+        groups.append(('and', terms))
+
+    return ('or', groups)
+
+
+def positive_terms(command):
+    """Join the terms of a text filter that are not negated, e.g. to rank matches by them"""
+    terms = [term.strip() for group in command.split(';') for term in group.split(',')]
+    return ' '.join(term for term in terms if not term.startswith('!'))
+
+
+def parse_numeric_range(arg_string, column_name, allow_decimal=False):
+    """
+    Parse numeric range arguments into a filter tree.
+    Supports: ranges (100-200), at-least (100+), at-most (100-), exact (100)
+    Returns: (tree, error_message) - error_message is None on success
+    """
+    args = [arg.strip() for arg in arg_string.split(',')]
+    conditions = []
+    number = float if allow_decimal else int
+
+    if allow_decimal:
+        range_pattern = r'(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)'
+        single_pattern = r'\d+(?:\.\d+)?'
+        modifier_pattern = r'\d+(?:\.\d+)?[\-+]'
+    else:
+        range_pattern = r'(\d+)-(\d+)'
+        single_pattern = r'\d+'
+        modifier_pattern = r'\d+[\-+]'
+
+    for arg in args:
+        if rng := re.fullmatch(range_pattern, arg):
+            start, end = rng.group(1), rng.group(2)
+            conditions.append(('range', column_name, number(start), number(end)))
+        elif re.fullmatch(modifier_pattern, arg):
+            value = number(arg[:-1])
+            # Missing values are stored as -1, so open-ended ranges stop at 0
+            if arg[-1] == '-':
+                conditions.append(('range', column_name, 0, value))
+            elif arg[-1] == '+':
+                conditions.append(('range', column_name, value, None))
+        elif re.fullmatch(single_pattern, arg):
+            conditions.append(('range', column_name, number(arg), number(arg)))
+        else:
+            return None, f"Invalid {column_name.lower()} format: '{arg}'"
+
+    return ('or', conditions), None
+
+
+def parse_year_range(arg_string):
+    """
+    Parse year arguments supporting decades, ranges, exact years, and modifiers.
+    Returns: (tree, error_message) - error_message is None on success
+    """
+    year_args = [arg.strip() for arg in arg_string.split(',')]
+    conditions = []
+
+    for arg in year_args:
+        if re.fullmatch(r'\d{4}s', arg):  # e.g., "1980s"
+            conditions.append(('equals', 'Decade', arg))
+        elif rng := re.fullmatch(r'(\d{4})-(\d{4})', arg):  # e.g., "1980-1989"
+            start, end = rng.group(1), rng.group(2)
+            conditions.append(('range', 'Year', int(start), int(end)))
+        elif re.fullmatch(r'\d{4}[\-+]', arg):  # e.g., "2000+", "1999-"
+            year_val = int(arg[:-1])
+            if arg[-1] == '-':
+                conditions.append(('range', 'Year', None, year_val))
+            elif arg[-1] == '+':
+                conditions.append(('range', 'Year', year_val, None))
+        elif re.fullmatch(r'\d{4}', arg):  # e.g., "1994"
+            conditions.append(('range', 'Year', int(arg), int(arg)))
+        else:
+            return None, f"Invalid year format: '{arg}'"
+
+    return ('or', conditions), None
+
+
+def compile_filters(args):
+    """
+    Compile every get flag into a single filter tree (a conjunction of one subtree per flag).
+    Returns: (tree, error_message) - error_message is None on success
+    """
+    filters = []
+
+    if args.rank:
+        tree, error = parse_numeric_range(args.rank, 'Rank')
+        if error:
+            return None, f"{error}\nValid formats: 50-100 (range), 1000- (up to), 42+ (at least), 42 (exact)"
+        filters.append(tree)
+
+    if args.top100:
+        filters.append(('range', 'Decade_Rank', 1, 100))
+
+    if args.runtime:
+        tree, error = parse_numeric_range(args.runtime, 'Runtime')
+        if error:
+            return None, f"{error}\nValid formats: 90-120 (range), 60- (up to), 90+ (at least), 95 (exact)"
+        filters.append(tree)
+
+    if args.year:
+        tree, error = parse_year_range(args.year)
+        if error:
+            return None, f"{error}\nValid formats: 1980s (decade), 1980-1989 (range), 1994 (exact), 2000+ (after)"
+        filters.append(tree)
+
+    if args.color is not None:
+        if args.color not in (0, 1):
+            return None, "The color flag only takes 1 (color) or 0 (black & white). Please try again."
+        filters.append(('equals', 'Color', 'TRUE' if args.color == 1 else 'FALSE'))
+
+    if args.silent is not None:
+        if args.silent not in (0, 1):
+            return None, "The silent flag only takes 1 (silent) or 0 (non-silent). Please try again."
+        filters.append(('equals', 'Silent', 'TRUE' if args.silent == 1 else 'FALSE'))
+
+    if args.rating:
+        tree, error = parse_numeric_range(args.rating, 'Rating', allow_decimal=True)
+        if error:
+            return None, f"{error}\nValid formats: 7.0-8.0 (range), 7.5- (up to), 7.9+ (at least), 7.9 (exact)"
+        filters.append(tree)
+
+    if args.votes:
+        tree, error = parse_numeric_range(args.votes, 'Votes')
+        if error:
+            return None, f"{error}\nValid formats: 5000-15000 (range), 100- (up to), 100000+ (at least), 100 (exact)"
+        filters.append(tree)
+
+    for flag, column in TEXT_FILTERS:
+        command = getattr(args, flag)
+        if command:
+            filters.append(parse_text_filter(command, column, exact=args.exact, fuzzy=args.fuzzy))
+
+    return ('and', filters), None
+
+
+def expand_fuzzy(tree, similar):
+    """
+    Replace every fuzzy node by its leaf or'ed with exact matches of the names most similar to its term.
+    similar(column, term, limit) returns those names, best first.
+    """
+    kind = tree[0]
+
+    if kind in ('and', 'or'):
+        return (kind, [expand_fuzzy(child, similar) for child in tree[1]])
+    if kind == 'not':
+        return ('not', expand_fuzzy(tree[1], similar))
+    if kind == 'fuzzy':
+        leaf = tree[1]
+        _, column, term = leaf
+        return ('or', [leaf] + [('name', column, name) for name in similar(column, term, FUZZY_MATCHES)])
+    return tree
+
+
+def find_suggestions(tree, matches, similar):
+    """
+    Find the name terms of a filter tree that match no movie at all, with the name most similar to each.
+    matches(leaf) tells whether a leaf matches any movie; negated and fuzzy terms are left out.
+    Returns: [(column, term, suggestion)]
+    """
+    kind = tree[0]
+
+    if kind in ('and', 'or'):
+        return [suggestion for child in tree[1] for suggestion in find_suggestions(child, matches, similar)]
+    if kind in ('contains', 'name'):
+        _, column, term = tree
+        if column in TEXT_INDEX_COLUMNS and not (kind == 'contains' and REGEX_CHARACTERS.search(term)) and not matches(tree):
+            names = similar(column, term, 1)
+            if names:
+                return [(column, term, names[0])]
+    return []
+
+
+def canonicalize(tree):
+    """
+    Normalize a filter tree so equivalent queries compare equal, e.g. to key cached results.
+    The order and repetition of and/or children, the case of substring terms and the
+    order, case and endings of plot words don't matter; regular expressions are kept as typed.
+    """
+    kind = tree[0]
+
+    if kind in ('and', 'or'):
+        children = set()
+        for child in tree[1]:
+            child = canonicalize(child)
+            children.update(child[1] if child[0] == kind else [child])
+        if len(children) == 1:
+            return children.pop()
+        return (kind, tuple(sorted(children, key=repr)))
+
+    if kind in ('not', 'fuzzy'):
+        return (kind, canonicalize(tree[1]))
+    if kind == 'range':
+        _, column, low, high = tree
+        return ('range', column, None if low is None else float(low), None if high is None else float(high))
+    if kind == 'equals':
+        return tree
+    if kind == 'contains':
+        _, column, term = tree
+        return ('contains', column, term if REGEX_CHARACTERS.search(term) else term.lower())
+    if kind == 'name':
+        return ('name', tree[1], tree[2].lower())
+    if kind == 'words':
+        _, column, term = tree
+        return ('words', column, ' '.join(sorted(set(tokenize(term)))))
+    raise ValueError(f"Unknown filter node: {kind}")
+
+
+def describe(tree):
+    """Render a filter tree as short text, e.g. "Year 1990-1999 | Year >= 2005" """
+    kind = tree[0]
+
+    if kind in ('and', 'or'):
+        if len(tree[1]) == 1:
+            return describe(tree[1][0])
+        parts = [describe(child) for child in tree[1]]
+        parts = [f'({part})' if child[0] in ('and', 'or') and len(child[1]) > 1 else part for child, part in zip(tree[1], parts)]
+        return (' & ' if kind == 'and' else ' | ').join(parts)
+
+    if kind == 'not':
+        return f'!{describe(tree[1])}'
+
+    if kind == 'range':
+        _, column, low, high = tree
+        if low is not None and low == high:
+            return f'{column} = {low}'
+        if high is None:
+            return f'{column} >= {low}'
+        if low is None:
+            return f'{column} <= {high}'
+        return f'{column} {low}-{high}'
+
+    if kind == 'equals':
+        return f'{tree[1]} = {tree[2]}'
+    if kind == 'contains':
+        return f'{tree[1]} ~ {tree[2]}'
+    if kind == 'name':
+        return f'{tree[1]} is {tree[2]}'
+    if kind == 'words':
+        return f'{tree[1]} has {tree[2]}'
+    raise ValueError(f"Unknown filter node: {kind}")
+
+
+def estimate(tree, movies, load_index):
+    """
+    Estimate the share of rows a filter tree keeps and what it costs to evaluate.
+    Ranges and categories are counted exactly in their sorted indexes, plot words are
+    bounded by the rarest word's document frequency and credit substrings use the
+    average number of movies per name in the column.
+    Returns: (selectivity, cost)
+    """
+    kind = tree[0]
+    rows = max(len(movies), 1)
+
+    if kind in ('and', 'or'):
+        estimates = [estimate(child, movies, load_index) for child in tree[1]]
+        cost = sum(cost for _, cost in estimates)
+        if kind == 'and':
+            return float(np.prod([selectivity for selectivity, _ in estimates])), cost
+        return min(1.0, sum(selectivity for selectivity, _ in estimates)), cost
+
+    if kind == 'not':
+        selectivity, cost = estimate(tree[1], movies, load_index)
+        return 1.0 - selectivity, cost
+
+    if kind == 'range':
+        _, column, low, high = tree
+        numeric_index = load_index('numeric', column)
+        if numeric_index is None:
+            return 0.5, NODE_COSTS['range']
+        return len(lookup_range(numeric_index, low, high)) / rows, NODE_COSTS['range']
+
+    if kind == 'equals':
+        _, column, value = tree
+        table = load_index('values', column)
+        if table is None:
+            return 0.5, NODE_COSTS['equals']
+        return len(table.get(value, [])) / rows, NODE_COSTS['equals']
+
+    if kind == 'words':
+        _, column, term = tree
+        plot_index = load_index('words', column)
+        counts = [len(get_postings(plot_index, token)[0]) for token in tokenize(term)]
+        return (min(counts) / rows if counts else 1.0), NODE_COSTS['words']
+
+    if kind == 'contains':
+        _, column, term = tree
+        text_index = None if REGEX_CHARACTERS.search(term) else load_index('text', column)
+        if text_index is None:
+            return SCAN_SELECTIVITY, NODE_COSTS['scan']
+        per_name = len(text_index['rows']) / max(len(text_index['starts']), 1)
+        return min(1.0, per_name / rows), NODE_COSTS['contains']
+
+    if kind == 'name':
+        _, column, term = tree
+        return len(lookup_name(load_index('text', column), term.lower())) / rows, NODE_COSTS['name']
+
+    raise ValueError(f"Unknown filter node: {kind}")
+
+
+def plan(tree, movies, load_index):
+    """
+    Reorder every conjunction so cheap, selective filters run first: children are sorted
+    by cost / (share of rows removed), which minimizes the expected work when each child
+    only has to look at the rows left by the ones before it.
+    """
+    kind = tree[0]
+
+    if kind == 'and':
+        children = [plan(child, movies, load_index) for child in tree[1]]
+
+        def rank(child):
+            selectivity, cost = estimate(child, movies, load_index)
+            return cost / (1.0 - selectivity) if selectivity < 1.0 else float('inf')
+
+        return ('and', sorted(children, key=rank))
+    if kind == 'or':
+        return ('or', [plan(child, movies, load_index) for child in tree[1]])
+    if kind == 'not':
+        return ('not', plan(tree[1], movies, load_index))
+    return tree
+
+
+def get_text(movies, load_index, column, rows=None):
+    """
+    A text column as a Series (only the rows at positions rows, when given), with interned
+    credits joined back into their comma-separated form for row scans.
+    """
+    role = load_index('credits', column)
+    if role is not None:
+        import pandas as pd
+        return pd.Series(join_credits(role, np.arange(len(movies)) if rows is None else rows), dtype=object)
+    return movies[column] if rows is None else movies[column].iloc[rows]
+
+
+def evaluate(tree, movies, load_index, trace=None, candidates=None):
+    """
+    Evaluate a filter tree as a numpy boolean mask over the catalog rows.
+    load_index(kind, column) returns the 'numeric', 'text' or 'words' index or the
+    interned 'credits' of a column (None when it has none) and is only called for
+    the columns filtered.
+    When trace is a list, every child of a top-level 'and' appends its description,
+    the rows before and after it and the seconds it took (used by get --explain).
+    candidates, when given, is a mask of the only rows the result matters for: row
+    scans skip the others, and the result outside it is unspecified.
+    """
+    kind = tree[0]
+
+    if kind == 'and':
+        mask = np.ones(len(movies), dtype=bool) if candidates is None else candidates.copy()
+        for position, child in enumerate(tree[1]):
+            if trace is None:
+                mask &= evaluate(child, movies, load_index, candidates=mask)
+            else:
+                rows_in, started = int(mask.sum()), time.perf_counter()
+                mask &= evaluate(child, movies, load_index, candidates=mask)
+                trace.append({'filter': describe(child), 'rows_in': rows_in, 'rows_out': int(mask.sum()),
+                              'seconds': time.perf_counter() - started})
+            if not mask.any():
+                if trace is not None:
+                    trace.extend({'filter': describe(rest), 'skipped': True} for rest in tree[1][position + 1:])
+                break
+        return mask
+
+    if kind == 'or':
+        mask = np.zeros(len(movies), dtype=bool)
+        for child in tree[1]:
+            mask |= evaluate(child, movies, load_index, candidates=candidates)
+        return mask
+
+    if kind == 'not':
+        return ~evaluate(tree[1], movies, load_index, candidates=candidates)
+
+    if kind == 'range':
+        _, column, low, high = tree
+        numeric_index = load_index('numeric', column)
+        if numeric_index is not None:
+            mask = np.zeros(len(movies), dtype=bool)
+            mask[lookup_range(numeric_index, low, high)] = True
+            return mask
+
+        values = movies[column].to_numpy()
+        mask = np.ones(len(movies), dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+    if kind == 'equals':
+        _, column, value = tree
+        table = load_index('values', column)
+        if table is not None:
+            mask = np.zeros(len(movies), dtype=bool)
+            mask[table.get(value, [])] = True
+            return mask
+        return (movies[column] == value).to_numpy()
+
+    if kind == 'contains':
+        _, column, term = tree
+        text_index = None if REGEX_CHARACTERS.search(term) else load_index('text', column)
+        if text_index is None and candidates is not None:
+            rows = np.flatnonzero(candidates)
+            positions = rows[scan_term(get_text(movies, load_index, column, rows), term)]
+        elif text_index is None:
+            positions = scan_term(get_text(movies, load_index, column), term)
+        else:
+            positions = lookup_term(text_index, term.lower())
+        mask = np.zeros(len(movies), dtype=bool)
+        mask[positions] = True
+        return mask
+
+    if kind == 'name':
+        _, column, term = tree
+        mask = np.zeros(len(movies), dtype=bool)
+        mask[lookup_name(load_index('text', column), term.lower())] = True
+        return mask
+
+    if kind == 'words':
+        _, column, term = tree
+        mask = np.zeros(len(movies), dtype=bool)
+        mask[match_words(load_index('words', column), term)] = True
+        return mask
+
+    raise ValueError(f"Unknown filter node: {kind}")
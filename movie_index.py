@@ -0,0 +1,371 @@
+import numpy as np
+import os
+import re
+import unicodedata
+
+TEXT_INDEX_COLUMNS = ['Director', 'Cast', 'Writer', 'Producer', 'Cinematographer', 'Editor',
+                      'Composer', 'Production_Company', 'Genre', 'Country', 'Language']
+
+# Terms using any of these are real regular expressions and keep the row scan
+REGEX_CHARACTERS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+# Row scans over at least this many rows are split into shards matched on a process pool
+PARALLEL_SCAN_ROWS = 200_000
+SHARDS_PER_WORKER = 4
+
+# Created on the first large scan and reused (e.g. by `movie serve`) afterwards
+scan_pool = None
+
+
+def build_postings(codes, positions, vocabulary):
+    """
+    Build an inverted index from (name code, row position) pairs.
+    Every distinct lower-cased name is stored once in a newline-separated blob, so a
+    substring search scans the vocabulary instead of every row. Name i occurs in the
+    rows rows[indptr[i]:indptr[i + 1]] (CSR layout, sorted row positions).
+    """
+    # A name listed twice for the same movie only needs one posting
+    pairs = np.unique(np.stack([codes.astype(np.int64), positions]), axis=1)
+    counts = np.bincount(pairs[0], minlength=len(vocabulary))
+
+    lengths = np.fromiter((len(name) + 1 for name in vocabulary), dtype=np.int64, count=len(vocabulary))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+    return {
+        'blob': '\n'.join(vocabulary),
+        'starts': starts,
+        'indptr': np.concatenate([[0], np.cumsum(counts)]),
+        'rows': pairs[1].astype(np.int32),
+    }
+
+
+def build_column_index(values):
+    """Build the inverted index for one comma-joined column"""
+    import pandas as pd
+
+    names = values.str.lower().str.split(', ').explode().dropna()
+    codes, vocabulary = pd.factorize(names.to_numpy(dtype=object), sort=True)
+    return build_postings(codes, names.index.to_numpy(dtype=np.int64), vocabulary)
+
+
+def build_credit_index(role):
+    """Build the inverted index for one interned credit column, over the names it uses only"""
+    import pandas as pd
+
+    used, inverse = np.unique(role['ids'], return_inverse=True)
+    codes, vocabulary = pd.factorize(np.asarray([role['names'][name_id].lower() for name_id in used.tolist()], dtype=object), sort=True)
+    positions = np.repeat(np.arange(len(role['indptr']) - 1, dtype=np.int64), np.diff(role['indptr']))
+    return build_postings(codes[inverse], positions, vocabulary)
+
+
+def build_text_index(movies, credits):
+    """Build the inverted indexes for every column filtered with build_text_filter_query"""
+    return {column: build_credit_index(credits[column]) if column in credits else build_column_index(movies[column].reset_index(drop=True))
+            for column in TEXT_INDEX_COLUMNS}
+
+
+def lookup_term(column_index, term):
+    """Return the sorted row positions whose column contains term (case-insensitive)"""
+    blob, starts, indptr, rows = column_index['blob'], column_index['starts'], column_index['indptr'], column_index['rows']
+    matched = []
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int32)
+
+    found = blob.find(term)
+    while found != -1:
+        name_id = int(np.searchsorted(starts, found, side='right')) - 1
+        matched.append(rows[indptr[name_id]:indptr[name_id + 1]])
+        if name_id + 1 >= len(starts):
+            break
+        found = blob.find(term, starts[name_id + 1])
+
+    if not matched:
+        return np.empty(0, dtype=np.int32)
+    return np.unique(np.concatenate(matched))
+
+
+def lookup_name(column_index, name):
+    """Return the sorted row positions with a name in column equal to name (lower-cased), by binary search"""
+    blob, starts, indptr, rows = column_index['blob'], column_index['starts'], column_index['indptr'], column_index['rows']
+
+    def vocabulary(name_id):
+        end = starts[name_id + 1] - 1 if name_id + 1 < len(starts) else len(blob)
+        return blob[starts[name_id]:end]
+
+    low, high = 0, len(starts)
+    while low < high:
+        middle = (low + high) // 2
+        if vocabulary(middle) < name:
+            low = middle + 1
+        else:
+            high = middle
+
+    if low == len(starts) or vocabulary(low) != name:
+        return np.empty(0, dtype=np.int32)
+    return rows[indptr[low]:indptr[low + 1]]
+
+
+def scan_shard(texts, term):
+    """Positions within texts matching term, as str.contains(term, case=False, na=False) would find them"""
+    pattern = re.compile(term, flags=re.IGNORECASE)
+    return [position for position, text in enumerate(texts) if isinstance(text, str) and pattern.search(text)]
+
+
+def scan_term(values, term):
+    """
+    Row-scan fallback for regular-expression terms, matching str.contains semantics.
+    Large scans are split into row shards matched across CPU cores, since the regex
+    engine holds the GIL; smaller ones (or single-core machines) stay serial.
+    """
+    global scan_pool
+
+    workers = os.cpu_count() or 1
+    if len(values) < PARALLEL_SCAN_ROWS or workers < 2:
+        return np.flatnonzero(values.str.contains(term, case=False, na=False).to_numpy())
+
+    re.compile(term)  # Report an invalid pattern here rather than from a worker
+    if scan_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        scan_pool = ProcessPoolExecutor(max_workers=workers)
+
+    texts = values.tolist()
+    bounds = np.linspace(0, len(texts), workers * SHARDS_PER_WORKER + 1).astype(np.int64)
+    shards = [scan_pool.submit(scan_shard, texts[start:end], term) for start, end in zip(bounds[:-1], bounds[1:])]
+    return np.concatenate([np.asarray(shard.result(), dtype=np.int64) + start for shard, start in zip(shards, bounds[:-1])])
+
+
+def close_scan_pool():
+    """Shut down the process pool of large scans, if one was started, and wait for its workers to exit"""
+    global scan_pool
+
+    if scan_pool is not None:
+        scan_pool.shutdown(wait=True, cancel_futures=True)
+        scan_pool = None
+
+
+# Ranked plot search (BM25)
+BM25_K1 = 1.2
+BM25_B = 0.75
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def stem(word):
+    """
+    Reduce a word to a crude stem so inflections match (haunts, haunted, haunting -> haunt).
+    A small subset of the Porter rules, which is plenty for one-sentence plot summaries.
+    """
+    if len(word) <= 3:
+        return word
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies'):
+        word = word[:-3] + 'y'
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+
+    for suffix in ('ingly', 'edly', 'ing', 'ed', 'ly'):
+        if word.endswith(suffix) and re.search(r'[aeiouy]', word[:-len(suffix)]) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # running -> run, stopped -> stop
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1]
+            break
+
+    if len(word) > 3 and word.endswith('e'):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text, stems=None):
+    """Split text into lower-cased, stemmed words; stems memoizes stem() across calls"""
+    if stems is None:
+        stems = {}
+    tokens = []
+    for word in WORD.findall(text.lower()):
+        token = stems.get(word)
+        if token is None:
+            token = stems[word] = stem(word)
+        tokens.append(token)
+    return tokens
+
+
+def build_plot_index(values):
+    """
+    Build a BM25 index over a free-text column.
+    Token t occurs in the documents docs[indptr[t]:indptr[t + 1]] with matching freqs.
+    """
+    stems = {}
+    terms = {}
+    term_ids, doc_ids, freqs, lengths = [], [], [], []
+
+    for position, text in enumerate(values.fillna('').tolist()):
+        tokens = tokenize(str(text), stems)
+        lengths.append(len(tokens))
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term_ids.append(terms.setdefault(token, len(terms)))
+            doc_ids.append(position)
+            freqs.append(count)
+
+    term_ids = np.asarray(term_ids, dtype=np.int64)
+    order = np.argsort(term_ids, kind='stable')
+    lengths = np.asarray(lengths, dtype=np.float64)
+
+    return {
+        'terms': terms,
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(terms)))]),
+        'docs': np.asarray(doc_ids, dtype=np.int32)[order],
+        'freqs': np.asarray(freqs, dtype=np.float32)[order],
+        'lengths': lengths,
+        'average_length': lengths.mean() if len(lengths) else 0.0,
+    }
+
+
+def get_postings(plot_index, token):
+    """Return (docs, freqs) for a token, empty when it never occurs"""
+    term_id = plot_index['terms'].get(token)
+    if term_id is None:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    start, end = plot_index['indptr'][term_id], plot_index['indptr'][term_id + 1]
+    return plot_index['docs'][start:end], plot_index['freqs'][start:end]
+
+
+def match_words(plot_index, term):
+    """Return the sorted positions of documents containing every word of term (whole words, stemmed)"""
+    tokens = tokenize(term)
+    if not tokens:
+        return np.arange(len(plot_index['lengths']))
+
+    positions = None
+    for token in set(tokens):
+        docs = get_postings(plot_index, token)[0]
+        positions = docs if positions is None else np.intersect1d(positions, docs, assume_unique=True)
+    return positions
+
+
+def score_documents(plot_index, query):
+    """Score every document against the words of query with BM25 (0 where nothing matches)"""
+    lengths = plot_index['lengths']
+    scores = np.zeros(len(lengths), dtype=np.float64)
+    if not len(lengths):
+        return scores
+
+    norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(plot_index['average_length'], 1e-9))
+    for token in set(tokenize(query)):
+        docs, freqs = get_postings(plot_index, token)
+        if not len(docs):
+            continue
+        idf = np.log(1 + (len(lengths) - len(docs) + 0.5) / (len(docs) + 0.5))
+        scores[docs] += idf * freqs * (BM25_K1 + 1) / (freqs + norms[docs])
+    return scores
+
+
+# Fuzzy name search: a name is similar to a term when it has at least FUZZY_THRESHOLD of the term's trigrams
+FUZZY_THRESHOLD = 0.6
+# Similar names a --fuzzy term matches besides its own substring matches, best first
+FUZZY_MATCHES = 20
+
+
+def normalize(text):
+    """Lower-case text and strip its accents (Kurosawá -> kurosawa)"""
+    return ''.join(char for char in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(char))
+
+
+def trigrams(text):
+    """The character trigrams of every word of text, padded so word starts and ends count ("  k", " ku", "kur", ..., "wa ")"""
+    return {f'  {word} '[i:i + 3] for word in WORD.findall(normalize(text)) for i in range(len(word) + 1)}
+
+
+def build_fuzzy_index(column_index, display):
+    """
+    Build a trigram index over the vocabulary of a text index, so similar names are found
+    without comparing the term to every name. Trigram g occurs in the names
+    names[indptr[g]:indptr[g + 1]]; display maps lower-cased names to how they are written.
+    """
+    vocabulary = column_index['blob'].split('\n') if len(column_index['starts']) else []
+    grams = {}
+    gram_ids, name_ids, sizes = [], [], []
+    for name_id, name in enumerate(vocabulary):
+        name_grams = trigrams(name)
+        sizes.append(len(name_grams))
+        for gram in name_grams:
+            gram_ids.append(grams.setdefault(gram, len(grams)))
+            name_ids.append(name_id)
+
+    gram_ids = np.asarray(gram_ids, dtype=np.int64)
+    order = np.argsort(gram_ids, kind='stable')
+    return {
+        'grams': grams,
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(gram_ids, minlength=len(grams)))]),
+        'names': np.asarray(name_ids, dtype=np.int32)[order],
+        'sizes': np.asarray(sizes, dtype=np.int32),
+        'display': [display.get(name, name) for name in vocabulary],
+    }
+
+
+def build_fuzzy_indexes(text_index, movies, credits):
+    """Build the trigram indexes for every column of the text index, displaying names as the catalog writes them"""
+    fuzzy = {}
+    for column, column_index in text_index.items():
+        if column in credits:
+            names = credits[column]['names']
+        else:
+            names = movies[column].dropna().str.split(', ').explode().unique().tolist()
+        fuzzy[column] = build_fuzzy_index(column_index, {name.lower(): name for name in reversed(names)})
+    return fuzzy
+
+
+def lookup_similar(fuzzy_index, term, limit=FUZZY_MATCHES):
+    """
+    Return the IDs of the names most similar to term (best first): those sharing the largest
+    share of the term's trigrams, and among equals the ones with the fewest trigrams of their own.
+    """
+    grams = trigrams(term)
+    gram_ids = [fuzzy_index['grams'][gram] for gram in grams if gram in fuzzy_index['grams']]
+    if not gram_ids:
+        return np.empty(0, dtype=np.int32)
+
+    indptr, names = fuzzy_index['indptr'], fuzzy_index['names']
+    candidates, shared = np.unique(np.concatenate([names[indptr[i]:indptr[i + 1]] for i in gram_ids]), return_counts=True)
+    scores = shared / len(grams)
+    similar = scores >= FUZZY_THRESHOLD
+    candidates, scores = candidates[similar], scores[similar]
+    return candidates[np.lexsort((fuzzy_index['sizes'][candidates], -scores))[:limit]]
+
+
+# Sorted numeric indexes
+NUMERIC_INDEX_COLUMNS = ['Rank', 'Decade_Rank', 'Runtime', 'Year', 'Rating', 'Votes']
+VALUE_INDEX_COLUMNS = ['Decade', 'Color', 'Silent']
+
+
+def build_numeric_index(movies):
+    """
+    Build sorted-permutation indexes for the numeric columns and value -> positions
+    tables for the categorical ones, so range and equality filters become binary searches.
+    """
+    import pandas as pd
+
+    columns = {}
+    for column in NUMERIC_INDEX_COLUMNS:
+        values = movies[column].to_numpy()
+        order = np.argsort(values, kind='stable').astype(np.int32)
+        columns[column] = {'order': order, 'values': values[order]}
+
+    tables = {}
+    for column in VALUE_INDEX_COLUMNS:
+        codes, uniques = pd.factorize(movies[column].astype(str).to_numpy(dtype=object))
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))])
+        tables[column] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+
+    return {'columns': columns, 'tables': tables}
+
+
+def lookup_range(column_index, low, high):
+    """Return the (unsorted) positions whose value lies in [low, high]; None bounds are open"""
+    values = column_index['values']
+    start = 0 if low is None else np.searchsorted(values, low, side='left')
+    end = len(values) if high is None else np.searchsorted(values, high, side='right')
+    return column_index['order'][start:max(start, end)]
@@ -0,0 +1,184 @@
+from contextlib import contextmanager
+import os
+import time
+
+# Journals larger than this (and twice their compacted size) are rewritten down to the current state
+COMPACT_BYTES = 64 * 1024
+ENTRY_BYTES = 40
+# Seconds after which a journal lock is taken to be left behind by a crashed process
+LOCK_SECONDS = 10
+# Bytes kept from before a reader's offset, to notice that the journal was rewritten since
+TAIL_BYTES = 64
+
+
+def get_journal_path(csv_path):
+    """Get the path of the pool-state journal kept next to movies.csv"""
+    return os.path.splitext(csv_path)[0] + '.pool.log'
+
+
+def get_journal_signature(csv_path):
+    """Cheap signature of the journal used to notice changes made by other processes"""
+    try:
+        stat = os.stat(get_journal_path(csv_path))
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def read_pool_journal(csv_path):
+    """
+    Read the pool-state journal as a list of (action, movie_id, date) entries.
+    Each line is tab separated: "remove<TAB>ID<TAB>date", "restore<TAB>ID<TAB>date"
+    or "reset<TAB><TAB>date".
+    A line cut short by a crash mid-append is ignored.
+    """
+    try:
+        with open(get_journal_path(csv_path), 'r', encoding='utf-8') as f:
+            return parse_entries(f.read())
+    except FileNotFoundError:
+        return []
+
+
+def parse_entries(text):
+    """Parse journal lines (see read_pool_journal) into (action, movie_id, date) entries"""
+    entries = []
+    for line in text.split('\n'):
+        fields = line.split('\t')
+        if len(fields) != 3:
+            continue
+        action, movie_id, date = fields
+        if action == 'reset':
+            entries.append((action, None, date))
+        elif action in ('remove', 'restore') and movie_id.isdigit():
+            entries.append((action, int(movie_id), date))
+    return entries
+
+
+def read_journal_since(csv_path, offset, tail):
+    """
+    Read the entries appended to the journal since a reader's byte offset, so readers that keep
+    something up to date with the pool only look at the changes. tail is the TAIL_BYTES before offset
+    as last read; when they differ, the journal was compacted or deleted since. An offset of None
+    stands for a reader that has read nothing yet.
+    Returns: (entries, offset, tail, restarted) - restarted when the entries are the whole journal
+    and the reader has to start over from the catalog's own pool state
+    """
+    restarted = offset is None
+    try:
+        with open(get_journal_path(csv_path), 'rb') as f:
+            if not restarted:
+                f.seek(max(offset - len(tail), 0))
+                restarted = f.read(len(tail)) != tail or f.tell() != offset
+            if restarted:
+                offset, tail = 0, b''
+                f.seek(0)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0, b'', restarted or offset != 0
+
+    # A line still being written (or cut short by a crash) is read again next time
+    end = data.rfind(b'\n') + 1
+    tail = (tail + data[:end])[-TAIL_BYTES:]
+    return parse_entries(data[:end].decode('utf-8', errors='replace')), offset + end, tail, restarted
+
+
+def format_entry(action, movie_id, date):
+    """Format a journal entry as a single line"""
+    return f"{action}\t{'' if movie_id is None else movie_id}\t{date}\n"
+
+
+def replay_pool_journal(removed, entries):
+    """Apply journal entries to a {movie ID: removal date} mapping"""
+    for action, movie_id, date in entries:
+        if action == 'reset':
+            removed.clear()
+        elif action == 'remove':
+            removed[movie_id] = date
+        elif action == 'restore':
+            removed.pop(movie_id, None)
+    return removed
+
+
+def load_pool_state(csv_path, light):
+    """
+    Get the removed movies as {movie ID: removal date}.
+    The catalog's own In_Pool/Date columns (kept in the light catalog) are the
+    starting point and the journal is replayed over them.
+    """
+    return replay_pool_journal(dict(light['removed']), read_pool_journal(csv_path))
+
+
+def apply_pool_state(movies, removed):
+    """Return a shallow copy of the catalog with In_Pool and Date reflecting the pool state"""
+    import numpy as np
+
+    is_removed = np.isin(movies['ID'].to_numpy(), np.fromiter(removed, dtype=np.int64, count=len(removed)))
+    movies = movies.copy(deep=False)
+    movies['In_Pool'] = np.where(is_removed, 'N', 'Y')
+    movies['Date'] = movies['Date'].astype(object).where(~is_removed, movies['ID'].map(removed))
+    return movies
+
+
+@contextmanager
+def lock_journal(csv_path):
+    """
+    Hold the journal's lock file while appending or compacting, so a compaction never
+    drops entries appended by another process. A lock older than LOCK_SECONDS was left
+    behind by a crash and is taken over.
+    """
+    lock_path = get_journal_path(csv_path) + '.lock'
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.01)
+
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def record_pool_changes(csv_path, entries, removed, light):
+    """
+    Append entries to the journal with a single write, so a remove costs O(1) and
+    concurrent invocations never overwrite each other. removed is the state after
+    the entries and tells when the journal has grown large enough to be compacted.
+    """
+    journal_path = get_journal_path(csv_path)
+    data = ''.join(format_entry(*entry) for entry in entries).encode('utf-8')
+
+    with lock_journal(csv_path):
+        fd = os.open(journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+        if os.path.getsize(journal_path) > max(COMPACT_BYTES, 2 * ENTRY_BYTES * len(removed)):
+            compact_pool_journal(csv_path, light)
+
+
+def compact_pool_journal(csv_path, light):
+    """
+    Rewrite the journal as a reset followed by one entry per removed movie.
+    The state is replayed from the journal on disk, which no other process can append
+    to while the caller holds the lock (see lock_journal).
+    """
+    journal_path = get_journal_path(csv_path)
+    tmp_path = f"{journal_path}.{os.getpid()}.tmp"
+    removed = load_pool_state(csv_path, light)
+
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(format_entry('reset', None, ''))
+        for movie_id, date in removed.items():
+            f.write(format_entry('remove', movie_id, date))
+    os.replace(tmp_path, journal_path)
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import numpy as np
+from movie_catalog import CREDIT_COLUMNS, join_credits
+
+# Movies formatted per chunk, so output starts right away and memory stays flat
+RENDER_CHUNK = 500
+
+GREY = '\033[90m'
+RESET = '\033[0m'
+SEPARATOR = f"{GREY}{'─' * 60}{RESET}"
+
+# Columns written by --format, in order; numeric placeholders (-1) are written as empty values
+EXPORT_COLUMNS = ['ID', 'Title', 'Year', 'Rank', 'Decade_Rank', 'Rating', 'Votes', 'Runtime', 'Genre', 'Director',
+                  'Cast', 'Writer', 'Producer', 'Cinematographer', 'Editor', 'Composer', 'Production_Company',
+                  'Country', 'Language', 'Decade', 'Color', 'Silent', 'Plot']
+NUMERIC_EXPORT_COLUMNS = ['Year', 'Rank', 'Decade_Rank', 'Rating', 'Votes', 'Runtime']
+
+
+def display_values(values):
+    """Show the -1 placeholder of coerced numeric columns as '-'"""
+    return np.where(values < 0, '-', values.astype(str))
+
+
+def format_runtimes(minutes):
+    """Convert minutes to 'Xh Ym' format"""
+    return [f'{value // 60}h {value % 60}m' if value >= 0 else '-' for value in minutes.tolist()]
+
+
+def get_rating_colors(ratings):
+    """Get color codes for ratings"""
+    return np.select([ratings >= 8.0, ratings >= 7.0], ['\033[92m', '\033[93m'], '\033[37m')
+
+
+def get_rank_colors(ranks):
+    """Get color codes for ranks"""
+    return np.select([ranks <= 0, ranks <= 100, ranks <= 500], ['\033[37m', '\033[92m', '\033[93m'], '\033[37m')
+
+
+def get_rank_badges(ranks):
+    """Get badges for top-ranked movies"""
+    return np.select([ranks <= 0, ranks <= 10, ranks <= 50, ranks <= 100],
+                     ['', ' \033[1;93m★\033[0m', ' \033[93m★\033[0m', ' \033[90m★\033[0m'], '')
+
+
+def format_votes(votes):
+    """Format vote counts with thousands separators"""
+    return [f'{value:,}' if value >= 0 else '-' for value in votes.tolist()]
+
+
+def get_top_cast_members(casts):
+    """Extract up to 5 top-billed cast members from the cast strings"""
+    return [','.join(cast.split(',', 5)[:5]) if isinstance(cast, str) and len(cast) > 1 else '-' for cast in casts]
+
+
+def format_movies(rows, minimal=False, pool_size=0):
+    """Format a chunk of movies (a frame or a mapping of column -> values) for display, one block of text per movie"""
+    titles = rows['Title'].tolist()
+    years = display_values(np.asarray(rows['Year']))
+    if minimal:
+        return [f"{title} {GREY}({year}){RESET}" for title, year in zip(titles, years)]
+
+    ranks = np.asarray(rows['Rank'])
+    ratings = np.asarray(rows['Rating'])
+    columns = zip(titles, years, get_rank_badges(ranks), get_rating_colors(ratings), display_values(ratings),
+                  format_votes(np.asarray(rows['Votes'])), get_rank_colors(ranks), display_values(ranks),
+                  rows['Director'].tolist(), rows['Genre'].tolist(), format_runtimes(np.asarray(rows['Runtime'])),
+                  get_top_cast_members(rows['Cast'].tolist()), rows['Plot'].tolist(), rows['ID'].tolist())
+
+    return [f"\n{SEPARATOR}\n"
+            f"{GREY}Movie:{RESET} \033[1m{title}{RESET} {GREY}({year}){RESET}{badge} ({rating_color}{rating}{RESET}, {votes} votes, Rank {rank_color}#{rank}{RESET}) [{pool_size} total]\n"
+            f"{GREY}Director:{RESET} {director}\n"
+            f"{GREY}Genre:{RESET} {genre}\n"
+            f"{GREY}Runtime:{RESET} {runtime}\n"
+            f"{GREY}Starring:{RESET} {cast}\n"
+            f"{GREY}Plot:{RESET} {plot}\n"
+            f"{GREY}ID:{RESET} {movie_id}"
+            for title, year, badge, rating_color, rating, votes, rank_color, rank, director, genre, runtime, cast, plot, movie_id in columns]
+
+
+def export_values(rows, column):
+    """A column of a chunk as plain Python values, None where the value is missing"""
+    values = rows[column].tolist()
+    if column in NUMERIC_EXPORT_COLUMNS:
+        return [value if value >= 0 else None for value in values]
+    return [None if value != value else value for value in values]  # NaN != NaN
+
+
+def format_records(rows, style, header):
+    """Format a chunk of movies as jsonl, tsv or csv (with the header row when header is True)"""
+    records = zip(*(export_values(rows, column) for column in EXPORT_COLUMNS))
+    if style == 'jsonl':
+        return '\n'.join(json.dumps(dict(zip(EXPORT_COLUMNS, record)), ensure_ascii=False) for record in records)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter='\t' if style == 'tsv' else ',', lineterminator='\n')
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(records)
+    return buffer.getvalue().rstrip('\n')
+
+
+def render_chunks(chunks, style=None, minimal=False, pool_size=0):
+    """Yield the output for movies given as chunks of rows (frames or mappings of column -> values)"""
+    for number, rows in enumerate(chunks):
+        if style:
+            yield format_records(rows, style, header=(number == 0))
+        else:
+            yield '\n'.join(format_movies(rows, minimal=minimal, pool_size=pool_size))
+
+    if not style and not minimal:
+        yield SEPARATOR
+
+
+def render_movies(movies, credits, positions, style=None, minimal=False, pool_size=0):
+    """
+    Yield the output for the movies at positions, chunk by chunk.
+    Rows are only gathered and formatted RENDER_CHUNK at a time, column by column,
+    with the interned credits they show joined back into text.
+    """
+    shown = CREDIT_COLUMNS if style else [] if minimal else ['Director', 'Cast']
+    chunks = (positions[start:start + RENDER_CHUNK] for start in range(0, len(positions), RENDER_CHUNK))
+    return render_chunks((movies.iloc[chunk].assign(**{column: join_credits(credits[column], chunk) for column in shown}) for chunk in chunks),
+                         style=style, minimal=minimal, pool_size=pool_size)
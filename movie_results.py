@@ -0,0 +1,81 @@
+import contextlib
+import numpy as np
+import os
+import secrets
+from collections import OrderedDict
+from movie_catalog import SNAPSHOT_VERSION, get_sidecar_path, read_sidecar, write_sidecar
+
+# Filter results kept per catalog version; the least recently used are dropped first
+RESULT_CACHE_ENTRIES = 64
+# Bound on the row positions kept across all entries (4 bytes each)
+RESULT_CACHE_POSITIONS = 4_000_000
+
+
+def get_result_path(csv_path, file):
+    """Get the path of the file holding one cached filter result"""
+    return os.path.splitext(csv_path)[0] + f'.{file}.npy'
+
+
+def remove_results(csv_path, entries):
+    """Delete the files of cached filter results; one already gone is skipped"""
+    for entry in entries:
+        with contextlib.suppress(OSError):
+            os.remove(get_result_path(csv_path, entry['file']))
+
+
+def load_result_index(csv_path, catalog_version):
+    """
+    Load the index of cached filter results as an OrderedDict of {query key: file and size}, oldest first.
+    Results from another catalog version are discarded along with their files.
+    """
+    sidecar = read_sidecar(get_sidecar_path(csv_path, 'result_index'))
+    if sidecar is None:
+        return OrderedDict()
+    if sidecar['sha1'] != catalog_version:
+        remove_results(csv_path, sidecar['data'].values())
+        return OrderedDict()
+    return sidecar['data']
+
+
+def save_result_index(csv_path, catalog_version, index):
+    """Write the index of cached filter results next to movies.csv; it holds no row positions"""
+    write_sidecar(get_sidecar_path(csv_path, 'result_index'), {'version': SNAPSHOT_VERSION, 'sha1': catalog_version, 'data': index})
+
+
+def load_result(csv_path, index, key):
+    """The matching row positions cached for a query key, None when there are none (or their file is gone)"""
+    entry = index.get(key)
+    if entry is None:
+        return None
+    try:
+        return np.load(get_result_path(csv_path, entry['file']))
+    except (OSError, ValueError):
+        return None
+
+
+def remember_result(csv_path, catalog_version, index, key, positions):
+    """
+    Store a filter result in a file of its own and add it to the index, evicting the least recently used
+    ones beyond the bounds. Only the new result and the small index are written.
+    Returns: False when the result is too large to be worth keeping
+    """
+    if len(positions) > RESULT_CACHE_POSITIONS // 4:
+        return False
+
+    file = f'result-{secrets.token_hex(8)}'
+    try:
+        np.save(get_result_path(csv_path, file), positions)
+    except OSError:
+        # A read-only install just skips caching
+        return False
+
+    evicted = [index.pop(key)] if key in index else []
+    index[key] = {'file': file, 'size': len(positions)}
+    total = sum(entry['size'] for entry in index.values())
+    while len(index) > RESULT_CACHE_ENTRIES or total > RESULT_CACHE_POSITIONS:
+        _, entry = index.popitem(last=False)
+        evicted.append(entry)
+        total -= entry['size']
+    save_result_index(csv_path, catalog_version, index)
+    remove_results(csv_path, evicted)
+    return True
@@ -0,0 +1,68 @@
+import numpy as np
+import random
+
+# Columns a --weight expression may refer to
+WEIGHT_COLUMNS = ['Rank', 'Decade_Rank', 'Runtime', 'Year', 'Rating', 'Votes']
+
+
+def get_weights(movies, positions, weight):
+    """
+    Compute the sampling weight of the rows at positions of movies (a frame or a mapping of column -> values).
+    weight is rating, votes, rank (better ranks weigh more) or an expression over
+    the numeric columns such as "Rating * Votes". Missing values weigh nothing.
+    Returns: (weights, error_message) - error_message is None on success
+    """
+    def column(name):
+        return np.asarray(movies[name])[positions].astype(np.float64)
+
+    if weight == 'rating':
+        weights = column('Rating')
+    elif weight == 'votes':
+        weights = column('Votes')
+    elif weight == 'rank':
+        ranks = column('Rank')
+        weights = np.divide(1.0, ranks, out=np.zeros_like(ranks), where=ranks > 0)
+    else:
+        import pandas as pd
+        try:
+            weights = pd.eval(weight, local_dict={name: column(name) for name in WEIGHT_COLUMNS})
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), positions.shape).copy()
+        except Exception as e:
+            return None, f"Invalid weight expression '{weight}': {e}\nValid weights: rating, votes, rank, or an expression over {', '.join(WEIGHT_COLUMNS)}"
+
+    weights[~np.isfinite(weights) | (weights < 0)] = 0
+    return weights, None
+
+
+def weighted_sample(weights, count, rng=None):
+    """
+    Draw count distinct indexes into weights, each draw proportional to its weight.
+    Draws binary-search the prefix sums of the weights (O(log n) each) and redraw the
+    rare duplicate; when count is a large share of the candidates the exponential-key
+    method is used instead. Zero-weight entries are only used once every weighted one is taken.
+    """
+    rng = rng or np.random.default_rng()
+    weighted = np.flatnonzero(weights > 0)
+
+    if count >= len(weighted):
+        unweighted = np.flatnonzero(weights <= 0)
+        return np.concatenate([rng.permutation(weighted), rng.choice(unweighted, count - len(weighted), replace=False)])
+
+    if count * 4 < len(weighted):
+        prefix = np.cumsum(weights[weighted])
+        chosen = {}
+        for _ in range(count * 20):
+            index = int(np.searchsorted(prefix, rng.random() * prefix[-1], side='right'))
+            chosen.setdefault(min(index, len(weighted) - 1), None)
+            if len(chosen) == count:
+                return weighted[list(chosen)]
+
+    # Efraimidis-Spirakis: the count largest keys u ** (1 / w) are a weighted sample without replacement
+    keys = np.log(rng.random(len(weighted))) / weights[weighted]
+    top = np.argpartition(-keys, count - 1)[:count]
+    return weighted[top[np.argsort(-keys[top])]]
+
+
+def uniform_sample(size, count, rng=None):
+    """Draw count distinct indexes out of range(size) in O(count)"""
+    return np.asarray((rng or random).sample(range(size), count), dtype=np.int64)
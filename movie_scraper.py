@@ -1,38 +1,27 @@
 import pandas as pd
+import argparse
+import csv
+import datetime
+import functools
+import hashlib
+import json
 import sys
 import os
-from imdb import Cinemagoer
 import re
+import zlib
 from unidecode import unidecode as ud
 import random
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-imdb = Cinemagoer()
-
-movie_db = {
-    'ID': [],
-    'Rank': [],
-    'Decade_Rank': [],
-    'Title': [],
-    'Director': [],
-    'Runtime': [],
-    'Genre': [],
-    'Year': [],
-    'Decade': [],
-    'Country': [],
-    'Language': [],
-    'Color': [],
-    'Silent': [],
-    'Rating': [],
-    'Votes': [],
-    'Cast': [],
-    'Writer': [],
-    'Producer': [],
-    'Cinematographer': [],
-    'Editor': [],
-    'Composer': [],
-    'Production_Company': [],
-    'Plot': []
-}
+COLUMNS = ['ID', 'Rank', 'Decade_Rank', 'Title', 'Director', 'Runtime', 'Genre', 'Year', 'Decade', 'Country',
+           'Language', 'Color', 'Silent', 'Rating', 'Votes', 'Cast', 'Writer', 'Producer', 'Cinematographer',
+           'Editor', 'Composer', 'Production_Company', 'Plot', 'IMDb_ID', 'Updated', 'In_Pool']
+
+# Columns a refresh fetches again; everything else about a title is kept as it is
+REFRESH_COLUMNS = ['Rating', 'Votes']
 
 ids = random.sample(range(10000, 100000), 26000)
 
@@ -44,8 +33,135 @@ def get_csv_path():
     
 csv_path = get_csv_path()
 
-movies = pd.read_csv(csv_path)
-movies.sort_values(["Ranking"], axis=0, ascending=[True], inplace=True)
+parser = argparse.ArgumentParser(description='Build the movie database from a ranked list of IMDb URLs.')
+parser.add_argument('mode', nargs='?', choices=['crawl', 'reextract', 'refresh'], default='crawl', help='crawl fetches every title; reextract rebuilds the output from the response cache alone; refresh updates ratings and votes in an existing output.')
+parser.add_argument('-i', '--input', type=str, default=csv_path, help='CSV with the source ranking (Ranking and URL columns).')
+parser.add_argument('-o', '--output', type=str, help='Where to write the movie database (default: new_movies.csv; refresh updates movies.csv in place).')
+parser.add_argument('--client', type=str, default='cinemagoer', help='Metadata source: "cinemagoer" (IMDb) or "local:DIR" to read DIR/<imdb id>.json files instead.')
+parser.add_argument('--workers', type=int, default=8, help='Number of titles fetched concurrently.')
+parser.add_argument('--rate', type=float, default=4.0, help='Maximum requests per second across all workers (0 for no limit).')
+parser.add_argument('--retries', type=int, default=5, help='Retries per title before it is given up on.')
+parser.add_argument('--backoff', type=float, default=1.0, help='Seconds to wait before the first retry; doubled on every further retry.')
+parser.add_argument('--failed', type=str, help='Where to write the titles that could not be fetched (default: next to the output).')
+parser.add_argument('--checkpoint', type=int, default=100, help='Rows between checkpoints (fsync of the output plus a progress file).')
+parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its last checkpoint.')
+parser.add_argument('--cache', type=str, default=os.path.join(os.path.dirname(csv_path), 'responses'), help='Directory of the raw response cache.')
+parser.add_argument('--no-cache', action='store_true', help="Don't save fetched responses to the cache.")
+parser.add_argument('--stale', type=int, help='refresh: titles not updated in this many days.')
+parser.add_argument('--ranks', type=str, help='refresh: titles in a rank band, e.g. 1-500.')
+parser.add_argument('--new', action='store_true', help='refresh: add the titles of the source ranking missing from the database.')
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='Processes used by reextract (default: one per CPU core).')
+
+def make_client(spec):
+    """
+    Create the metadata client. Any object with a get_movie(imdb_id) method returning a
+    dict-like record works, so tests can swap in a local fake for Cinemagoer.
+    """
+    if spec == 'cinemagoer':
+        from imdb import Cinemagoer
+        return Cinemagoer()
+    if spec.startswith('local:'):
+        directory = spec[len('local:'):]
+
+        def get_movie(imdb_id):
+            with open(os.path.join(directory, f'{imdb_id}.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        return types.SimpleNamespace(get_movie=get_movie)
+    raise ValueError(f"Unknown metadata client: '{spec}'")
+
+def make_rate_limiter(rate):
+    """Return a wait() function that lets at most `rate` calls per second through, across threads"""
+    lock = threading.Lock()
+    next_slot = [time.monotonic()]
+
+    def wait():
+        if rate <= 0:
+            return
+        with lock:
+            now = time.monotonic()
+            slot = max(now, next_slot[0])
+            next_slot[0] = slot + 1 / rate
+        time.sleep(slot - now)
+
+    return wait
+
+def to_plain(value):
+    """Convert a Cinemagoer response (Movie, Person and Company objects included) to plain JSON data"""
+    if isinstance(value, dict):
+        return {str(key): to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if isinstance(getattr(value, 'data', None), dict):
+        return to_plain(value.data)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def store_response(cache_dir, imdb_id, info):
+    """
+    Save a raw response in the cache.
+    Responses are stored once per content as zlib-compressed JSON under objects/<sha1>,
+    and titles/<imdb id> names the object holding the latest response for a title.
+    """
+    data = to_plain(info)
+    # Keep the alternative key names Cinemagoer resolves (e.g. 'runtime' for 'runtimes')
+    aliases = {alias: key for alias, key in getattr(info, 'keys_alias', {}).items() if key in data}
+    content = json.dumps({'data': data, 'aliases': aliases}, sort_keys=True).encode('utf-8')
+    digest = hashlib.sha1(content).hexdigest()
+
+    object_path = os.path.join(cache_dir, 'objects', digest[:2], digest[2:])
+    if not os.path.exists(object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        with open(f'{object_path}.{threading.get_ident()}.tmp', 'wb') as f:
+            f.write(zlib.compress(content, 6))
+        os.replace(f'{object_path}.{threading.get_ident()}.tmp', object_path)
+
+    title_path = os.path.join(cache_dir, 'titles', str(imdb_id))
+    os.makedirs(os.path.dirname(title_path), exist_ok=True)
+    with open(f'{title_path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(digest)
+    os.replace(f'{title_path}.tmp', title_path)
+
+def load_response(cache_dir, imdb_id):
+    """Load the cached response for a title as a dict, or None if it was never cached"""
+    try:
+        with open(os.path.join(cache_dir, 'titles', str(imdb_id)), 'r', encoding='utf-8') as f:
+            digest = f.read().strip()
+        with open(os.path.join(cache_dir, 'objects', digest[:2], digest[2:]), 'rb') as f:
+            entry = json.loads(zlib.decompress(f.read()))
+    except (OSError, ValueError, zlib.error):
+        return None
+
+    info = entry['data']
+    for alias, key in entry['aliases'].items():
+        info.setdefault(alias, info[key])
+    return info
+
+def fetch_movie(client, imdb_id, wait, retries, backoff, cache_dir=None):
+    """
+    Fetch one title, retrying failures with exponential backoff and jitter.
+    Successful responses are saved to cache_dir when one is given.
+    Returns: (info, error) - info is None once every retry has failed
+    """
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(min(backoff * 2 ** (attempt - 1), 60) * random.uniform(0.5, 1.5))
+        wait()
+        try:
+            info = client.get_movie(imdb_id)
+            if info:
+                break
+            error = 'Empty response'
+        except Exception as e:
+            error = str(e)
+    else:
+        return None, error
+
+    if cache_dir:
+        store_response(cache_dir, imdb_id, info)
+    return info, None
 
 def getID():
     try:
@@ -53,12 +169,11 @@ def getID():
     except:
         return '-'
 
-def getDecadeRank(info):
-    try:
-        decade = f"{str(info['year'])[:-1]}0s"
-        return movie_db['Decade'].count(decade) + 1
-    except:
+def getDecadeRank(decade, decade_counts):
+    if decade == '-':
         return '-'
+    decade_counts[decade] = decade_counts.get(decade, 0) + 1
+    return decade_counts[decade]
     
 def getTitle(info):
     try:
@@ -199,48 +314,339 @@ def getPlot(info):
     except:
         return '-'
 
-offset = 0
-row = 1
-for _, movie in movies.iterrows():
-    if imdbID := re.fullmatch(r'https:\/\/www.imdb.com\/title\/tt(.+)\/', str(movie['URL'])):
-        info = None
-        while not info:
-            try:
-                info = imdb.get_movie(imdbID.group(1))
-            except Exception as e:
-                print(f'Exception: {str(e)}, {row} / {len(movies)}')
-
-        movie_db['ID'].append(str(getID()))
-        movie_db['Rank'].append(int(movie['Ranking']) - offset)
-        movie_db['Decade_Rank'].append(getDecadeRank(info))
-        movie_db['Title'].append(getTitle(info))
-        movie_db['Director'].append(getDirectors(info))
-        movie_db['Runtime'].append(getRuntime(info))
-        movie_db['Genre'].append(getGenres(info))
-        movie_db['Year'].append(getYear(info))
-        movie_db['Decade'].append(getDecade(info))
-        movie_db['Country'].append(getCountry(info))
-        movie_db['Language'].append(getLanguage(info))
-        movie_db['Color'].append(getColor(info))
-        movie_db['Silent'].append(getSilent(info))
-        movie_db['Rating'].append(getRating(info))
-        movie_db['Votes'].append(getVotes(info))
-        movie_db['Cast'].append(getCast(info))
-        movie_db['Writer'].append(getWriters(info))
-        movie_db['Producer'].append(getProducers(info))
-        movie_db['Cinematographer'].append(getCinematographers(info))
-        movie_db['Editor'].append(getEditors(info))
-        movie_db['Composer'].append(getComposers(info))
-        movie_db['Production_Company'].append(getProductionCompanies(info))
-        movie_db['Plot'].append(getPlot(info))
-
-        movie_df = pd.DataFrame(movie_db)
-        movie_df["In_Pool"] = "Y"
-        movie_df.to_csv(r'C:\Users\grant\Desktop\Coding\Projects\Movie-Picker\new_movies3.csv', index=False, encoding='utf-8-sig')
-
-        print(f'Processed row {row} / {len(movies)}')
-        row += 1
+def extract_fields(info):
+    """Extract the columns that only depend on the title itself"""
+    return {
+        'Title': getTitle(info),
+        'Director': getDirectors(info),
+        'Runtime': getRuntime(info),
+        'Genre': getGenres(info),
+        'Year': getYear(info),
+        'Decade': getDecade(info),
+        'Country': getCountry(info),
+        'Language': getLanguage(info),
+        'Color': getColor(info),
+        'Silent': getSilent(info),
+        'Rating': getRating(info),
+        'Votes': getVotes(info),
+        'Cast': getCast(info),
+        'Writer': getWriters(info),
+        'Producer': getProducers(info),
+        'Cinematographer': getCinematographers(info),
+        'Editor': getEditors(info),
+        'Composer': getComposers(info),
+        'Production_Company': getProductionCompanies(info),
+        'Plot': getPlot(info),
+    }
+
+def extract_cached(cache_dir, imdb_id):
+    """Extract the fields of a cached title, or None if it is not in the cache"""
+    info = load_response(cache_dir, imdb_id)
+    if info is None:
+        return None
+    fields = extract_fields(info)
+    fetched = os.path.getmtime(os.path.join(cache_dir, 'titles', str(imdb_id)))
+    fields['Updated'] = datetime.date.fromtimestamp(fetched).isoformat()
+    return fields
+
+def build_row(movie, imdb_id, fields, offset, decade_counts):
+    """Complete a title's fields into an output row; rows have to be built in ranking order"""
+    return {
+        'ID': str(getID()),
+        'Rank': int(movie['Ranking']) - offset,
+        'Decade_Rank': getDecadeRank(fields['Decade'], decade_counts),
+        **fields,
+        'IMDb_ID': imdb_id,
+        'Updated': fields.get('Updated', datetime.date.today().isoformat()),
+        'In_Pool': 'Y',
+    }
+
+def get_imdb_id(movie):
+    """Get the IMDb ID from a source row's URL, or None for titles not on IMDb"""
+    imdbID = re.fullmatch(r'https:\/\/www.imdb.com\/title\/tt(.+)\/', str(movie['URL']))
+    return imdbID and imdbID.group(1)
+
+def write_failed(args, failed):
+    """Write the titles that could not be processed next to the output"""
+    if failed:
+        failed_path = args.failed or os.path.splitext(args.output)[0] + '.failed.csv'
+        pd.DataFrame(failed).to_csv(failed_path, index=False)
+        print(f"{len(failed)} titles could not be processed; they are listed in {failed_path}")
+
+def get_checkpoint_path(output_path):
+    """Get the path of the progress file kept next to the output"""
+    return os.path.splitext(output_path)[0] + '.checkpoint.json'
+
+def read_checkpoint(output_path):
+    """Read the progress of an interrupted run, or None if there is none"""
+    try:
+        with open(get_checkpoint_path(output_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_checkpoint(output, output_path, state):
+    """
+    Make every row written so far durable, then record how far the run got.
+    The checkpoint notes the output size so rows written after it can be dropped on resume.
+    """
+    output.flush()
+    os.fsync(output.fileno())
+    state['bytes'] = os.fstat(output.fileno()).st_size
+
+    checkpoint_path = get_checkpoint_path(output_path)
+    with open(checkpoint_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+def crawl(args, movies):
+    """Fetch every title of the source ranking and stream the extracted rows to the output"""
+    state = {'row': 0, 'offset': 0, 'decades': {}, 'failed': []}
+    if args.resume:
+        checkpoint = read_checkpoint(args.output)
+        if checkpoint is None or not os.path.exists(args.output):
+            print(f"No checkpoint to resume from for {args.output}.")
+            return
+        state.update(checkpoint)
+
+        # Rows written after the checkpoint are fetched again
+        with open(args.output, 'r+b') as f:
+            f.truncate(state['bytes'])
+        used = set(pd.read_csv(args.output, usecols=['ID'], dtype=str, encoding='utf-8-sig')['ID'])
+        ids[:] = [movie_id for movie_id in ids if str(movie_id) not in used]
+        print(f"Resuming after row {state['row']} / {len(movies)}")
+
+    client = make_client(args.client)
+    wait = make_rate_limiter(args.rate)
+    cache_dir = None if args.no_cache else args.cache
+
+    # Rows are streamed to the output as they are extracted instead of rewriting the whole file
+    output = open(args.output, 'a' if args.resume else 'w', newline='', encoding='utf-8-sig')
+    writer = csv.DictWriter(output, fieldnames=COLUMNS)
+    if not args.resume:
+        writer.writeheader()
+
+    # Fetches run concurrently; rows are still added in ranking order so ranks and IDs stay stable
+    with output, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        fetches = []
+        fetch_ids = {}
+        for row, (_, movie) in enumerate(movies.iterrows(), start=1):
+            imdb_id = fetch_ids[row] = get_imdb_id(movie)
+            if row > state['row'] and imdb_id:
+                fetches.append(executor.submit(fetch_movie, client, imdb_id, wait, args.retries, args.backoff, cache_dir))
+            else:
+                fetches.append(None)
+
+        try:
+            for row, ((_, movie), fetch) in enumerate(zip(movies.iterrows(), fetches), start=1):
+                if row <= state['row']:
+                    continue
+
+                if fetch:
+                    info, error = fetch.result()
+                    if info is None:
+                        # Its rank is left unused so later titles keep theirs
+                        state['failed'].append({'Row': row, 'Ranking': int(movie['Ranking']), 'URL': movie['URL'], 'Error': error})
+                        state['row'] = row
+                        print(f'Failed row {row} / {len(movies)}: {error}')
+                    else:
+                        writer.writerow(build_row(movie, fetch_ids[row], extract_fields(info), state['offset'], state['decades']))
+                        state['row'] = row
+                        print(f'Processed row {row} / {len(movies)}')
+                else:
+                    state['offset'] += 1
+                    state['row'] = row
+                    print(f'Processed row {row} / {len(movies)}')
+
+                if args.checkpoint > 0 and row % args.checkpoint == 0:
+                    write_checkpoint(output, args.output, state)
+        except KeyboardInterrupt:
+            # Don't wait for the fetches still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            write_checkpoint(output, args.output, state)
+
+    write_failed(args, state['failed'])
+
+def reextract(args, movies):
+    """
+    Rebuild the output from the response cache alone, e.g. after fixing an extractor.
+    Extraction is spread over worker processes; IDs, ranks and decade ranks are
+    assigned here in ranking order, the same way a crawl assigns them.
+    """
+    imdb_ids = [get_imdb_id(movie) for _, movie in movies.iterrows()]
+    cached_ids = [imdb_id for imdb_id in imdb_ids if imdb_id]
+    offset = 0
+    decade_counts = {}
+    failed = []
+
+    with open(args.output, 'w', newline='', encoding='utf-8-sig') as output, ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        writer = csv.DictWriter(output, fieldnames=COLUMNS)
+        writer.writeheader()
+
+        chunksize = max(1, min(256, len(cached_ids) // (4 * (args.jobs or 1)) + 1))
+        extracted = executor.map(functools.partial(extract_cached, args.cache), cached_ids, chunksize=chunksize)
+        for row, ((_, movie), imdb_id) in enumerate(zip(movies.iterrows(), imdb_ids), start=1):
+            if not imdb_id:
+                offset += 1
+                continue
+
+            fields = next(extracted)
+            if fields is None:
+                failed.append({'Row': row, 'Ranking': int(movie['Ranking']), 'URL': movie['URL'], 'Error': 'Not in the response cache'})
+            else:
+                writer.writerow(build_row(movie, imdb_id, fields, offset, decade_counts))
+
+    print(f'Re-extracted {len(cached_ids) - len(failed)} / {len(movies)} rows from {args.cache}')
+    write_failed(args, failed)
+
+def read_source(path):
+    """Read the source ranking in ranking order, None when the file has no Ranking and URL columns"""
+    movies = pd.read_csv(path)
+    if not {'Ranking', 'URL'} <= set(movies.columns):
+        return None
+    movies.sort_values(["Ranking"], axis=0, ascending=[True], inplace=True)
+    return movies
+
+def rank_source(movies):
+    """Get {IMDb ID: rank} for the source ranking, ranked the way a crawl ranks them"""
+    ranks = {}
+    offset = 0
+    for _, movie in movies.iterrows():
+        imdb_id = get_imdb_id(movie)
+        if imdb_id:
+            ranks[imdb_id] = int(movie['Ranking']) - offset
+        else:
+            offset += 1
+    return ranks
+
+def refresh(args):
+    """
+    Fetch the ratings and votes of a subset of an existing database again and merge
+    them in by IMDb ID. IDs, pool state and every other column are left untouched, so
+    a weekly refresh costs a fraction of a crawl and loses no watch history.
+    """
+    if args.stale is None and not args.ranks and not args.new:
+        print("Choose what to refresh with --stale DAYS, --ranks A-B and/or --new.")
+        return
+    if args.ranks and not re.fullmatch(r'\d+-\d+', args.ranks):
+        print(f"Invalid rank band: '{args.ranks}'\nValid format: 1-500")
+        return
+
+    if not os.path.exists(args.output):
+        print(f"Can't refresh {args.output}: the file doesn't exist. Please try again with -o pointing at the movie database.")
+        return
+    catalog = pd.read_csv(args.output, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+    # The source ranking is only needed to add titles or to match titles without IMDb IDs
+    source_ranks = {}
+    if args.new or 'IMDb_ID' not in catalog.columns:
+        movies = read_source(args.input)
+        if movies is None:
+            print(f"{args.input} is not a source ranking (Ranking and URL columns). Please try again with -i pointing at one.")
+            return
+        source_ranks = rank_source(movies)
+
+    # Databases crawled before IMDb IDs were stored are matched to the source ranking by rank
+    if 'IMDb_ID' not in catalog.columns:
+        by_rank = {str(rank): imdb_id for imdb_id, rank in source_ranks.items()}
+        position = catalog.columns.get_loc('In_Pool') if 'In_Pool' in catalog.columns else len(catalog.columns)
+        catalog.insert(position, 'IMDb_ID', catalog['Rank'].map(by_rank).fillna(''))
+        catalog.insert(position + 1, 'Updated', '')
+        print(f"Matched {(catalog['IMDb_ID'] != '').sum()} / {len(catalog)} titles to the source ranking by rank.")
+
+    selected = pd.Series(False, index=catalog.index)
+    if args.stale is not None:
+        updated = pd.to_datetime(catalog['Updated'], errors='coerce')
+        selected |= updated.isna() | (updated < pd.Timestamp.today().normalize() - pd.Timedelta(days=args.stale))
+    if args.ranks:
+        low, high = (int(bound) for bound in args.ranks.split('-'))
+        selected |= pd.to_numeric(catalog['Rank'], errors='coerce').between(low, high)
+    selected &= catalog['IMDb_ID'] != ''
+
+    known = set(catalog['IMDb_ID'])
+    new_ids = [imdb_id for imdb_id in source_ranks if imdb_id not in known] if args.new else []
+    targets = catalog.loc[selected, 'IMDb_ID'].tolist() + new_ids
+    print(f"Refreshing {selected.sum()} titles and adding {len(new_ids)} new ones.")
+
+    client = make_client(args.client)
+    wait = make_rate_limiter(args.rate)
+    cache_dir = None if args.no_cache else args.cache
+    today = datetime.date.today().isoformat()
+    used = set(catalog['ID'])
+    ids[:] = [movie_id for movie_id in ids if str(movie_id) not in used]
+    positions = {imdb_id: position for position, imdb_id in enumerate(catalog['IMDb_ID']) if imdb_id}
+    new_rows = []
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        fetches = [executor.submit(fetch_movie, client, imdb_id, wait, args.retries, args.backoff, cache_dir) for imdb_id in targets]
+        try:
+            for done, (imdb_id, fetch) in enumerate(zip(targets, fetches), start=1):
+                info, error = fetch.result()
+                if info is None:
+                    failed.append({'IMDb_ID': imdb_id, 'Error': error})
+                    print(f'Failed title {done} / {len(targets)}: {error}')
+                    continue
+
+                if imdb_id in positions:
+                    fields = extract_fields(info)
+                    row = catalog.index[positions[imdb_id]]
+                    # A partial response keeps the stored values, and the title counts as not refreshed
+                    missing = [column for column in REFRESH_COLUMNS if str(fields[column]) == '-']
+                    for column in REFRESH_COLUMNS:
+                        if column not in missing:
+                            catalog.at[row, column] = str(fields[column])
+                    if missing:
+                        error = f"No {' or '.join(missing).lower()} in the response"
+                        failed.append({'IMDb_ID': imdb_id, 'Error': error})
+                        print(f'Failed title {done} / {len(targets)}: {error}')
+                        continue
+                    catalog.at[row, 'Updated'] = today
+                else:
+                    row = build_row({'Ranking': source_ranks[imdb_id]}, imdb_id, extract_fields(info), 0, {})
+                    new_rows.append({column: str(value) for column, value in row.items()})
+                print(f'Processed title {done} / {len(targets)}')
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    # New titles shift the ranks of the titles below them; decade ranks are recounted to match
+    if args.new:
+        catalog = pd.concat([catalog, pd.DataFrame(new_rows, columns=catalog.columns)], ignore_index=True).fillna('')
+        ranks = catalog['IMDb_ID'].map(source_ranks)
+        catalog['Rank'] = ranks.astype('Int64').astype(str).where(ranks.notna(), catalog['Rank'])
+        numeric_ranks = pd.to_numeric(catalog['Rank'], errors='coerce')
+        dated = (catalog['Decade'] != '-') & numeric_ranks.notna()
+        decade_ranks = numeric_ranks[dated].groupby(catalog.loc[dated, 'Decade']).rank(method='first')
+        catalog.loc[dated, 'Decade_Rank'] = decade_ranks.astype(int).astype(str)
+
+    tmp_path = f'{args.output}.{os.getpid()}.tmp'
+    catalog.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, args.output)
+
+    print(f'Updated {args.output}')
+    write_failed(args, failed)
+
+def main():
+    args = parser.parse_args()
+    if args.output is None:
+        args.output = csv_path if args.mode == 'refresh' else os.path.join(os.path.dirname(csv_path), 'new_movies.csv')
+
+    if args.mode == 'refresh':
+        refresh(args)
+        return
+
+    movies = read_source(args.input)
+    if movies is None:
+        print(f"{args.input} is not a source ranking (Ranking and URL columns). Please try again with -i pointing at one.")
+    elif args.mode == 'reextract':
+        reextract(args, movies)
     else:
-        offset += 1
-        print(f'Processed row {row} / {len(movies)}')
-        row += 1
\ No newline at end of file
+        crawl(args, movies)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import contextlib
+import numpy as np
+import os
+import random
+import secrets
+from movie_catalog import SNAPSHOT_VERSION, get_sidecar_path, read_sidecar, write_sidecar
+
+# Movies checked against the pool at a time while handing out picks
+SESSION_BATCH = 500
+
+
+def new_seed():
+    """A random seed for a session started without --seed"""
+    return random.getrandbits(32)
+
+
+def shuffle(weights, size, seed, round_number):
+    """
+    The order of one round of a session as a permutation of range(size).
+    With weights, it is a weighted sample of every movie (Efraimidis-Spirakis keys, as in weighted_sample),
+    so heavier movies tend to come first; zero-weight movies come last, in random order.
+    """
+    rng = np.random.default_rng([seed, round_number])
+    order = rng.permutation(size)
+    if weights is None:
+        return order
+
+    keys = np.full(size, -np.inf)
+    weighted = weights[order] > 0
+    keys[weighted] = np.log(rng.random(int(weighted.sum()))) / weights[order][weighted]
+    return order[np.argsort(-keys, kind='stable')]
+
+
+def create_session(key, movies, seed, weights=None):
+    """
+    Start a session over the movies matching a query (row positions or rowids).
+    The movies are handed out in a seeded random order, favoring heavier ones when weights are given.
+    """
+    order = shuffle(weights, len(movies), seed, 0)
+    return {'key': key, 'seed': seed, 'round': 0, 'cursor': 0, 'movies': movies[order],
+            'weights': None if weights is None else weights[order]}
+
+
+def next_round(session):
+    """Reshuffle a session that handed out all of its movies, so it starts over in a new order"""
+    session['round'] += 1
+    order = shuffle(session['weights'], len(session['movies']), session['seed'], session['round'])
+    session['movies'] = session['movies'][order]
+    if session['weights'] is not None:
+        session['weights'] = session['weights'][order]
+    session['cursor'] = 0
+
+
+def take_from_session(session, count, in_pool):
+    """
+    Hand out the next count movies of a session (the rest of the round when count is None), moving its cursor.
+    Movies removed from the pool since the session started are skipped and restored ones are handed out
+    in their turn, so only the movies looked at are checked: in_pool(movies) gives a mask over a batch.
+    A round that has nothing left starts the next one.
+    Returns: (movies, finished) - finished when this was the end of the round
+    """
+    movies = session['movies']
+    taken = []
+    total = 0
+    for attempt in range(2):
+        cursor = session['cursor']
+        while cursor < len(movies) and (count is None or total < count):
+            batch = movies[cursor:cursor + SESSION_BATCH]
+            kept = np.flatnonzero(in_pool(batch))
+            if count is not None and len(kept) > count - total:
+                kept = kept[:count - total]
+                cursor += int(kept[-1]) + 1
+            else:
+                cursor += len(batch)
+            taken.append(batch[kept])
+            total += len(kept)
+        session['cursor'] = cursor
+
+        if total or attempt or len(movies) == 0:
+            break
+        next_round(session)
+        movies = session['movies']
+
+    chosen = np.concatenate(taken) if taken else movies[:0]
+    return chosen, session['cursor'] >= len(movies)
+
+
+def get_order_path(csv_path, file, part):
+    """Get the path of one part ('movies' or 'weights') of a stored session shuffle"""
+    return os.path.splitext(csv_path)[0] + f'.{file}.{part}.npy'
+
+
+def remove_orders(csv_path, states):
+    """Delete the stored shuffles of sessions; a file still mapped (e.g. on Windows) is left for later"""
+    for state in states:
+        for part in ('movies', 'weights'):
+            with contextlib.suppress(OSError):
+                os.remove(get_order_path(csv_path, state['file'], part))
+
+
+def load_sessions(csv_path, catalog_version):
+    """
+    Load the state of the CSV catalog's sessions as {name: key, seed, round, cursor, weighted and file}.
+    Sessions from another catalog version are discarded along with their shuffles.
+    """
+    sidecar = read_sidecar(get_sidecar_path(csv_path, 'sessions'))
+    if sidecar is None:
+        return {}
+    if sidecar['sha1'] != catalog_version:
+        remove_orders(csv_path, sidecar['data'].values())
+        return {}
+    return sidecar['data']
+
+
+def load_session(csv_path, catalog_version, name):
+    """
+    Load a session of the CSV catalog, None when there is none by that name.
+    Its shuffle is memory-mapped, so handing out picks only reads the part looked at.
+    """
+    state = load_sessions(csv_path, catalog_version).get(name)
+    if state is None:
+        return None
+    try:
+        movies = np.load(get_order_path(csv_path, state['file'], 'movies'), mmap_mode='r')
+        weights = np.load(get_order_path(csv_path, state['file'], 'weights'), mmap_mode='r') if state['weighted'] else None
+    except (OSError, ValueError):
+        return None
+    return {**state, 'movies': movies, 'weights': weights}
+
+
+def save_session(csv_path, catalog_version, name, session, cursor_only=False):
+    """
+    Store a session of the CSV catalog. The shuffle is only written when the session starts or reshuffles,
+    to files of its own; otherwise only the small state file with every session's cursor is rewritten.
+    """
+    sessions = load_sessions(csv_path, catalog_version)
+    state = sessions.get(name)
+    if not cursor_only or state is None:
+        file = f'session-{secrets.token_hex(8)}'
+        np.save(get_order_path(csv_path, file, 'movies'), np.asarray(session['movies']))
+        if session['weights'] is not None:
+            np.save(get_order_path(csv_path, file, 'weights'), np.asarray(session['weights']))
+        if state is not None:
+            remove_orders(csv_path, [state])
+        state = {'file': file, 'weighted': session['weights'] is not None}
+
+    sessions[name] = {**state, 'key': session['key'], 'seed': session['seed'], 'round': session['round'], 'cursor': session['cursor']}
+    write_sidecar(get_sidecar_path(csv_path, 'sessions'), {'version': SNAPSHOT_VERSION, 'sha1': catalog_version, 'data': sessions})
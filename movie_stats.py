@@ -0,0 +1,187 @@
+import json
+import numpy as np
+from movie_catalog import SNAPSHOT_VERSION, get_sidecar_path, read_sidecar, write_sidecar
+from movie_render import GREY, RESET
+
+# Breakdowns reported by `movie stats`, in order
+STAT_DIMENSIONS = ['Decade', 'Genre', 'Language', 'Country', 'Rank']
+# Comma-joined columns, where a movie counts toward every name it lists
+EXPLODED_COLUMNS = ['Genre', 'Language', 'Country']
+# Upper bounds of the rank bands; better ranks come first and a last band holds the rest
+RANK_BANDS = [100, 500, 1000, 5000]
+RANK_BAND_LABELS = ([f'{low + 1}-{high}' for low, high in zip([0] + RANK_BANDS, RANK_BANDS)]
+                    + [f'{RANK_BANDS[-1] + 1}+', 'Unranked'])
+
+
+def get_rank_bands(ranks):
+    """The index into RANK_BAND_LABELS of every rank (-1 is unranked)"""
+    return np.where(ranks > 0, np.searchsorted(RANK_BANDS, ranks, side='left'), len(RANK_BAND_LABELS) - 1)
+
+
+def get_stat_values(movies, dimension):
+    """
+    The values every movie counts toward in a dimension.
+    Returns: (positions, values) - row positions and their values, one pair per (movie, value), missing values left out
+    """
+    if dimension == 'Rank':
+        bands = get_rank_bands(movies['Rank'].to_numpy())
+        return np.arange(len(movies)), np.asarray(RANK_BAND_LABELS, dtype=object)[bands]
+
+    values = movies[dimension].reset_index(drop=True).astype(object)
+    if dimension in EXPLODED_COLUMNS:
+        values = values.str.split(', ').explode()
+    values = values[values.notna() & (values != '-')]
+    return values.index.to_numpy(dtype=np.int64), values.to_numpy(dtype=object)
+
+
+def build_stats(movies):
+    """
+    Build the groups counted by `movie stats`: one per (dimension, value), with the movies in it.
+    The groups of the movie at row position p are groups[indptr[p]:indptr[p + 1]] (CSR layout) and
+    IDs are kept sorted along with their row positions, so a movie's groups are found in O(log n).
+    """
+    import pandas as pd
+
+    labels, positions, codes = [], [], []
+    for dimension in STAT_DIMENSIONS:
+        rows, values = get_stat_values(movies, dimension)
+        value_codes, uniques = pd.factorize(values, sort=True)
+        positions.append(rows)
+        codes.append(value_codes.astype(np.int64) + len(labels))
+        labels.extend((dimension, value) for value in uniques.tolist())
+
+    # A value listed twice for the same movie only counts once; packed keys sort by row position first
+    keys = np.unique(np.concatenate(positions) * len(labels) + np.concatenate(codes))
+    rows, groups = np.divmod(keys, len(labels))
+    ids = movies['ID'].to_numpy(dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    return {
+        'labels': labels,
+        'totals': np.bincount(groups, minlength=len(labels)),
+        'indptr': np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(movies)))]),
+        'groups': groups.astype(np.int32),
+        'ids': ids[order],
+        'positions': order,
+    }
+
+
+def find_positions(stats, movie_ids):
+    """The row positions of the given movie IDs, leaving out unknown ones"""
+    movie_ids = np.fromiter(movie_ids, dtype=np.int64)
+    found = np.minimum(np.searchsorted(stats['ids'], movie_ids), len(stats['ids']) - 1)
+    return stats['positions'][found[stats['ids'][found] == movie_ids]]
+
+
+def count_groups(stats, positions):
+    """How many of the movies at positions are in every group"""
+    indptr = stats['indptr']
+    starts, lengths = indptr[positions], indptr[positions + 1] - indptr[positions]
+    # The group slices of every movie, gathered as one array of indexes into groups
+    flat = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return np.bincount(stats['groups'][flat], minlength=len(stats['labels']))
+
+
+def replay_changes(entries):
+    """
+    Net effect of pool journal entries on the removed movies, taking every movie's first entry to
+    change its state (a journal only records changes). A reset in between drops what came before it.
+    Returns: (reset, added, restored) - whether there was a reset, the IDs removed and those restored
+    """
+    reset, initial, current = False, {}, {}
+    for action, movie_id, _ in entries:
+        if action == 'reset':
+            reset, initial, current = True, {}, {}
+            continue
+        removing = action == 'remove'
+        if movie_id not in current:
+            initial[movie_id] = False if reset else not removing
+        current[movie_id] = removing
+    added = [movie_id for movie_id, gone in current.items() if gone and not initial[movie_id]]
+    restored = [movie_id for movie_id, gone in current.items() if not gone and initial[movie_id]]
+    return reset, added, restored
+
+
+def update_removed_counts(stats, counts, entries, base=None):
+    """
+    Bring the removed counts of every group up to date with the pool journal entries added since they were
+    counted; each removed or restored movie is looked up in O(1) groups. counts is {'removed': movies counted,
+    'groups': counts per group, 'offset'/'tail': how far the journal was read (see read_journal_since)}.
+    base, when given, holds the IDs removed in the catalog itself, which the counts start over from.
+    Returns: True when the counts changed
+    """
+    reset, added, restored = replay_changes(entries)
+    if base is not None or reset:
+        # Counting starts over from the catalog's own state, or from an empty pool after a reset
+        counts['groups'] = np.zeros(len(stats['labels']), dtype=np.int64)
+        counts['removed'] = 0
+        if base and not reset:
+            added = set(base).union(added).difference(restored)
+            restored = []
+    elif not added and not restored:
+        return False
+
+    for movie_ids, step in ((added, 1), (restored, -1)):
+        if movie_ids:
+            positions = find_positions(stats, movie_ids)
+            counts['groups'] = counts['groups'] + step * count_groups(stats, positions)
+            counts['removed'] += step * len(positions)
+    return True
+
+
+def load_removed_counts(csv_path, catalog_version, stats):
+    """Load the removed counts of the CSV catalog's groups as last saved (see update_removed_counts)"""
+    sidecar = read_sidecar(get_sidecar_path(csv_path, 'pool_stats'))
+    if sidecar is None or sidecar['sha1'] != catalog_version or 'offset' not in sidecar['data']:
+        return {'removed': 0, 'groups': np.zeros(len(stats['labels']), dtype=np.int64), 'offset': None, 'tail': b''}
+    return sidecar['data']
+
+
+def save_removed_counts(csv_path, catalog_version, counts):
+    """Write the removed counts next to movies.csv; they are a few numbers per group and the journal offset"""
+    write_sidecar(get_sidecar_path(csv_path, 'pool_stats'), {'version': SNAPSHOT_VERSION, 'sha1': catalog_version, 'data': counts})
+
+
+def order_rows(rows):
+    """
+    Order (dimension, value, remaining, removed) rows for display: decades and rank bands in their own
+    order, the other breakdowns with the most remaining movies first.
+    """
+    def key(row):
+        dimension, value, remaining, removed = row
+        if dimension == 'Rank':
+            rank = RANK_BAND_LABELS.index(value)
+        elif dimension == 'Decade':
+            rank = 0
+        else:
+            rank = -remaining
+        return STAT_DIMENSIONS.index(dimension), rank, value
+
+    return sorted(rows, key=key)
+
+
+def format_stats(rows, movies, removed, style=None):
+    """
+    Format the breakdowns as tables (default), JSON or TSV lines of dimension, value, remaining and removed.
+    Values no movie counts toward are left out.
+    """
+    rows = order_rows(row for row in rows if row[2] or row[3])
+    if style == 'json':
+        breakdowns = {dimension: [] for dimension in STAT_DIMENSIONS}
+        for dimension, value, remaining, gone in rows:
+            breakdowns[dimension].append({'value': value, 'remaining': remaining, 'removed': gone})
+        return json.dumps({'remaining': movies - removed, 'removed': removed, 'breakdowns': breakdowns}, ensure_ascii=False)
+    if style == 'tsv':
+        return '\n'.join(['dimension\tvalue\tremaining\tremoved', f'All\tAll\t{movies - removed}\t{removed}']
+                         + [f'{dimension}\t{value}\t{remaining}\t{gone}' for dimension, value, remaining, gone in rows])
+
+    lines = [f'{movies - removed:,} of {movies:,} movies remaining ({removed:,} removed)']
+    for dimension in STAT_DIMENSIONS:
+        shown = [row for row in rows if row[0] == dimension]
+        if not shown:
+            continue
+        title = 'Rank band' if dimension == 'Rank' else dimension
+        width = max(len(title), *(len(value) for _, value, _, _ in shown))
+        lines.append('')
+        lines.append(f"{GREY}{title:<{width}}  {'Remaining':>10}  {'Removed':>10}{RESET}")
+        lines.extend(f'{value:<{width}}  {remaining:>10,}  {gone:>10,}' for _, value, remaining, gone in shown)
+    return '\n'.join(lines)
@@ -0,0 +1,67 @@
+"""
+Startup budget for the commands that don't filter: `movie -h`, `list`, `remove` and `reset`
+must neither import pandas/numpy nor get slower than STARTUP_BUDGET.
+Run with `python -m pytest test_startup.py` or `python -m unittest test_startup`.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from movie_benchmark import catalog_ids, generate_catalog
+
+MOVIE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'movie.py')
+CATALOG_ROWS = 2000
+# Seconds a command may take from a cold interpreter; generous so slow machines don't fail
+STARTUP_BUDGET = 1.0
+HEAVY_MODULES = ('pandas', 'numpy')
+
+
+class StartupTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.catalog = os.path.join(cls.directory.name, 'movies.csv')
+        generate_catalog(cls.catalog, CATALOG_ROWS)
+        cls.movie_id = str(catalog_ids(CATALOG_ROWS, 0)[0])
+        # The first command builds the snapshot and light catalog, which does need pandas
+        cls.run_movie(['list'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    @classmethod
+    def run_movie(cls, arguments, python_options=()):
+        """Run movie.py against the test catalog. Returns: (seconds, stderr)"""
+        environment = dict(os.environ, MOVIE_CSV=cls.catalog)
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, *python_options, MOVIE, *arguments], env=environment,
+                                capture_output=True, text=True)
+        seconds = time.perf_counter() - started
+        if result.returncode != 0:
+            raise AssertionError(f"movie {' '.join(arguments)} failed:\n{result.stderr}")
+        return seconds, result.stderr
+
+    def imported_modules(self, arguments):
+        """The top-level modules a command imports, from -X importtime"""
+        _, report = self.run_movie(arguments, ['-X', 'importtime'])
+        # Lines look like "import time:       123 |        456 |   pandas.core"
+        return {line.rsplit('|', 1)[1].strip().split('.')[0] for line in report.splitlines() if line.startswith('import time:') and '|' in line}
+
+    def test_no_heavy_imports(self):
+        for arguments in (['-h'], ['list'], ['remove', self.movie_id], ['reset']):
+            with self.subTest(command=' '.join(arguments)):
+                modules = self.imported_modules(arguments)
+                self.assertFalse(modules & set(HEAVY_MODULES), f"movie {' '.join(arguments)} imported {sorted(modules & set(HEAVY_MODULES))}")
+
+    def test_startup_budget(self):
+        for arguments in (['-h'], ['list']):
+            with self.subTest(command=' '.join(arguments)):
+                seconds = min(self.run_movie(arguments)[0] for _ in range(3))
+                self.assertLess(seconds, STARTUP_BUDGET, f"movie {' '.join(arguments)} took {seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    unittest.main()